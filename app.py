@@ -1,7 +1,10 @@
 import streamlit as st
-from chatbot.chatbot_core import run_chatbot_pipeline
+from chatbot.chatbot_core import run_chatbot_pipeline_stream, warmup
 from llm.chatbot_llm import chatbot_llm  # gpt-4o-mini 모델 (시스템 프롬프트 활용)
 
+# 모델/벡터 DB는 백그라운드에서 미리 로드 (화면은 바로 뜨고, 프로세스당 한 번만 실행)
+warmup(background=True)
+
 # 가운데 정렬된 제목 (큰 글씨)
 st.markdown(
     """
@@ -31,13 +34,6 @@ chat_history = st.session_state['all_histories'].setdefault(session_id, [])
 user_input = st.text_input("질문을 입력하세요:", key="input_box")
 submit = st.button("질문하기")
 
-if submit and user_input:
-    with st.spinner("답변 생성 중..."):
-        answer = run_chatbot_pipeline(user_input, session_id=session_id)
-        chat_history.append(("질문", user_input))
-        chat_history.append(("응답", answer))
-        # st.session_state['input_box'] = ""
-
 # 2. 히스토리 출력 (최신이 아래쪽)
 for role, text in chat_history:
     if role == "질문":
@@ -45,6 +41,15 @@ for role, text in chat_history:
     else:
         st.markdown(f"**🤖 응답:** {text}")
 
+# 새 질문은 히스토리 맨 아래에 최종 답변을 토큰 단위로 바로 출력
+if submit and user_input:
+    st.markdown(f"**👤 질문:** {user_input}")
+    st.markdown("**🤖 응답:**")
+    answer = st.write_stream(run_chatbot_pipeline_stream(user_input, session_id=session_id))
+    chat_history.append(("질문", user_input))
+    chat_history.append(("응답", answer))
+    # st.session_state['input_box'] = ""
+
 # 3. 히스토리 다운로드 버튼
 if chat_history:
     history_str = ""
@@ -0,0 +1,269 @@
+# 검색 / 라우팅 / 임베딩 핫패스 오프라인 마이크로 벤치마크
+# - 합성 FAISS 인덱스 + 청크 파일(크기 지정)을 만들어 실제 rag 모듈 함수를 시간 측정
+# - LLM은 결정적인 가짜 모델(FakeListChatModel)로 대체 → 네트워크 없이 CPU만으로 실행
+# - 결과는 JSON으로 저장해서 커밋 간 비교 (--compare 이전결과.json)
+#
+# 사용법 : python -m benchmarks.bench_hot_paths --sizes 10000,100000 --queries 200
+#          python -m benchmarks.bench_hot_paths --sizes 10000 --compare benchmarks/results/이전.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+# config.py가 OPENAI_API_KEY를 환경변수로 등록하므로 오프라인용 더미 키를 먼저 넣어 둔다 (실제 호출 없음)
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+import numpy as np
+import faiss
+
+
+def timeit(fn, repeat: int, warmup: int = 1) -> dict:
+    """fn을 repeat번 실행한 소요 시간(ms) 통계"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times = np.array(times)
+    return {
+        "repeat": repeat,
+        "mean_ms": float(times.mean()),
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "min_ms": float(times.min()),
+    }
+
+
+def random_unit_vectors(rng, n: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_synthetic_db(workdir: str, size: int, dim: int, seed: int, batch: int = 100_000):
+    """size개 벡터의 정규화 IndexFlatIP + 청크 저장소 생성 (메모리는 batch 단위로만 사용)"""
+    from rag.chunk_store import ChunkStoreWriter, chunk_store_path
+
+    rng = np.random.default_rng(seed)
+    index = faiss.IndexFlatIP(dim)
+    chunk_path = os.path.join(workdir, f"synthetic_{size}_chunks.txt")
+    with ChunkStoreWriter(chunk_store_path(chunk_path)) as writer:
+        for start in range(0, size, batch):
+            n = min(batch, size - start)
+            index.add(random_unit_vectors(rng, n, dim))
+            for i in range(start, start + n):
+                writer.add(f"질문 {i}: 합성 청크 본문입니다. 약 복용 방법과 주의 사항 {i % 97}")
+    index_path = os.path.join(workdir, f"synthetic_{size}_index.faiss")
+    faiss.write_index(index, index_path)
+    return index_path, chunk_path
+
+
+def bench_retrieval(size: int, args, workdir: str) -> dict:
+    from rag.vector_store import load_vector_db_by_path, search_context, search_context_batch
+
+    index_path, chunk_path = build_synthetic_db(workdir, size, args.dim, args.seed)
+    results = {"size": size, "dim": args.dim}
+    results["load_vector_db_by_path"] = timeit(
+        lambda: load_vector_db_by_path(index_path, chunk_path), repeat=args.load_repeat, warmup=0
+    )
+    chunks, index = load_vector_db_by_path(index_path, chunk_path)
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = random_unit_vectors(rng, args.queries, args.dim)
+    it = iter(range(10**9))
+    results["context_search"] = timeit(
+        lambda: search_context(index, chunks, queries[next(it) % len(queries)], top_k=3, threshold=0.5),
+        repeat=args.queries,
+    )
+    results["context_search_batch"] = timeit(
+        lambda: search_context_batch(index, chunks, queries, top_k=3, threshold=0.5), repeat=args.batch_repeat
+    )
+    results["context_search_batch"]["queries_per_call"] = len(queries)
+
+    os.remove(index_path)
+    shutil.rmtree(os.path.splitext(chunk_path)[0] + ".chunks")
+    return results
+
+
+def bench_routing(args) -> dict:
+    """카테고리 유사도 단계 : (N, D) 카테고리 임베딩과 질문의 내적 + top-k + kNN 분류"""
+    from rag.category_classifier import KNNCategoryClassifier
+
+    rng = np.random.default_rng(args.seed + 2)
+    labels = ["medicine", "treatment", "assist_answer", "assist_question", "internal_answer", "internal_question"]
+    embeddings = random_unit_vectors(rng, args.category_size, args.dim)
+    categories = [labels[i % len(labels)] for i in range(args.category_size)]
+    queries = random_unit_vectors(rng, args.queries, args.dim)
+    classifier = KNNCategoryClassifier(embeddings, categories)
+    it = iter(range(10**9))
+
+    def route_once():
+        q = queries[next(it) % len(queries)]
+        sims = np.dot(embeddings, q)
+        top_idx = np.argsort(sims)[-3:][::-1]
+        classifier.predict_from_sims(sims)
+        return top_idx
+
+    return {
+        "category_size": args.category_size,
+        "category_similarity": timeit(route_once, repeat=args.queries),
+        "category_similarity_batch": timeit(lambda: queries @ embeddings.T, repeat=args.batch_repeat),
+    }
+
+
+def bench_encode(args) -> dict:
+    """load_embedder().encode 처리량. 모델이 로컬 캐시에 없으면(오프라인) 건너뜀"""
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    try:
+        from rag.embedder import load_embedder
+        model = load_embedder()
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+    texts = [f"타이레놀과 이부프로펜을 같이 먹어도 되나요? 예시 질문 {i}" for i in range(args.encode_docs)]
+    single = timeit(lambda: model.encode([texts[0]]), repeat=args.encode_repeat)
+    start = time.perf_counter()
+    model.encode(texts, batch_size=64)
+    elapsed = time.perf_counter() - start
+    return {"single_query": single, "batch_docs": len(texts), "docs_per_sec": len(texts) / elapsed}
+
+
+def bench_history(args) -> dict:
+    """세션 히스토리가 길어질 때 최종 챗봇 체인(가짜 LLM) 한 턴의 소요 시간"""
+    from langchain_core.chat_history import InMemoryChatMessageHistory
+    from langchain_core.language_models import FakeListChatModel
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.runnables.history import RunnableWithMessageHistory
+    from llm.chatbot_llm import chatbot_prompt
+
+    fake_llm = FakeListChatModel(responses=["결정적인 가짜 응답입니다. " * 20])
+    store = {}
+    chain = RunnableWithMessageHistory(
+        chatbot_prompt | fake_llm | StrOutputParser(),
+        lambda session_id: store.setdefault(session_id, InMemoryChatMessageHistory()),
+        input_messages_key="question",
+        history_messages_key="history",
+    )
+    config = {"configurable": {"session_id": "bench"}}
+    checkpoints = {}
+    for turn in range(1, args.history_turns + 1):
+        start = time.perf_counter()
+        chain.invoke({"question": f"질문 {turn}", "draft_answer": "전문 LLM 초안"}, config=config)
+        elapsed = (time.perf_counter() - start) * 1000
+        if turn in (1, 10, 50, 100, 200, 500) or turn == args.history_turns:
+            checkpoints[str(turn)] = {"turn_ms": elapsed, "history_messages": len(store["bench"].messages)}
+    return {"turns": args.history_turns, "checkpoints": checkpoints}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: dict, previous_path: str):
+    """이전 결과와 *_ms / docs_per_sec 항목 비율 출력 (ratio > 1 이면 느려짐)"""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+
+    def flatten(obj, prefix=""):
+        out = {}
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                out.update(flatten(v, f"{prefix}.{k}" if prefix else k))
+        elif isinstance(obj, list):
+            for item in obj:
+                key = item.get("size", len(out)) if isinstance(item, dict) else len(out)
+                out.update(flatten(item, f"{prefix}[{key}]"))
+        elif isinstance(obj, (int, float)):
+            out[prefix] = obj
+        return out
+
+    cur, prev = flatten(current["results"]), flatten(previous["results"])
+    print(f"\n[비교] {previous.get('commit')} → {current['commit']}")
+    for key in sorted(cur):
+        if key in prev and prev[key] and (key.endswith("p50_ms") or key.endswith("docs_per_sec")):
+            ratio = cur[key] / prev[key]
+            if key.endswith("docs_per_sec"):
+                ratio = 1 / ratio
+            flag = "  ⚠ 느려짐" if ratio > 1.1 else ""
+            print(f"  {key:<60} {prev[key]:>12.3f} → {cur[key]:>12.3f}  (x{ratio:.2f}){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MediChain 핫패스 오프라인 벤치마크")
+    parser.add_argument("--sizes", default="10000,100000", help="합성 인덱스 벡터 수 (쉼표 구분, 예: 10000,1000000,5000000)")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--category-size", type=int, default=20000)
+    parser.add_argument("--load-repeat", type=int, default=3)
+    parser.add_argument("--batch-repeat", type=int, default=5)
+    parser.add_argument("--encode-docs", type=int, default=512)
+    parser.add_argument("--encode-repeat", type=int, default=20)
+    parser.add_argument("--history-turns", type=int, default=200)
+    parser.add_argument("--skip", default="", help="건너뛸 항목 (retrieval,routing,encode,history)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="합성 파일 작업 폴더 (기본: 임시 폴더)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: benchmarks/results/bench_<commit>_<시각>.json)")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+    skip = set(filter(None, args.skip.split(",")))
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="medichain_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    results = {}
+    try:
+        if "retrieval" not in skip:
+            results["retrieval"] = []
+            for size in [int(s) for s in args.sizes.split(",") if s]:
+                print(f"[retrieval] size={size}")
+                results["retrieval"].append(bench_retrieval(size, args, workdir))
+        if "routing" not in skip:
+            print("[routing]")
+            results["routing"] = bench_routing(args)
+        if "encode" not in skip:
+            print("[encode]")
+            results["encode"] = bench_encode(args)
+        if "history" not in skip:
+            print("[history]")
+            results["history"] = bench_history(args)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "faiss": getattr(faiss, "__version__", "unknown"),
+            "faiss_omp_threads": faiss.omp_get_max_threads(),
+        },
+        "params": vars(args),
+        "results": results,
+    }
+    output = args.output or os.path.join("benchmarks", "results", f"bench_{commit}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장 : {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
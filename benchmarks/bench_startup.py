@@ -0,0 +1,92 @@
+# chatbot_core 콜드 스타트 프로파일링
+# 1) python -X importtime 으로 `import chatbot.chatbot_core` 시간을 모듈별로 측정 (모델 로드 없이 import만)
+# 2) --warmup 이면 warmup()으로 리소스별 로드 시간도 측정
+# import 시간이 예산(--budget-ms)을 넘으면 종료 코드 1 → CI/배포 전 체크용
+#
+# 사용법 : python -m benchmarks.bench_startup --budget-ms 3000 --top 15 [--warmup]
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+def profile_import(module: str) -> dict:
+    """새 인터프리터에서 module을 import하고 -X importtime 출력(stderr)을 파싱"""
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{module} import 실패:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2    # 들여쓰기 2칸 = import 깊이 1
+        rows.append({
+            "module": name.strip(),
+            "depth": depth,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    total = next((r["cumulative_ms"] for r in reversed(rows) if r["module"] == module), None)
+    return {"module": module, "total_ms": total, "modules": rows}
+
+
+def profile_warmup() -> dict:
+    """현재 프로세스에서 warmup()을 실행하고 리소스별 로드 시간(chatbot_init_seconds)을 읽는다"""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    from chatbot.chatbot_core import warmup
+    from chatbot.metrics import metrics
+
+    warmup()
+    snapshot = metrics.snapshot()
+    return {
+        h["labels"]["resource"]: round(h["sum"] * 1000, 2)
+        for h in snapshot["histograms"]
+        if h["name"] == "chatbot_init_seconds"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="chatbot_core import/warmup 시간 측정")
+    parser.add_argument("--module", default="chatbot.chatbot_core")
+    parser.add_argument("--budget-ms", type=float, default=3000, help="import 시간 예산 (ms)")
+    parser.add_argument("--top", type=int, default=15, help="누적 시간 상위 모듈 출력 개수")
+    parser.add_argument("--warmup", action="store_true", help="리소스 warmup 시간도 측정 (모델/벡터 DB 필요)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    result = profile_import(args.module)
+    print(f"[import] {args.module} : {result['total_ms']:.1f} ms (예산 {args.budget_ms:.0f} ms)")
+    # 대상 모듈이 직접 import한 모듈(깊이 1) 중 누적 시간이 큰 순서
+    direct = [r for r in result["modules"] if r["depth"] == 1]
+    for row in sorted(direct, key=lambda r: r["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"  {row['module']:<40} {row['cumulative_ms']:>10.1f} ms")
+
+    if args.warmup:
+        result["warmup_ms"] = profile_warmup()
+        print("[warmup]")
+        for name, ms in result["warmup_ms"].items():
+            print(f"  {name:<40} {ms:>10.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if result["total_ms"] is not None and result["total_ms"] > args.budget_ms:
+        print(f"[실패] import 시간이 예산을 초과했습니다.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,9 @@ import faiss
 import numpy as np
 import streamlit as st
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from rag.model_registry import get_embedding_model
+from rag.chunk_store import open_chunks
+from rag.index_factory import read_index
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
@@ -17,21 +19,21 @@ openai_key = os.getenv("OPENAI_API_KEY")
 
 @st.cache_resource
 def load_embedding_model():
-    return SentenceTransformer("jhgan/ko-sroberta-multitask")
+    return get_embedding_model("jhgan/ko-sroberta-multitask")
 
 @st.cache_resource
 def load_faiss_index(index_path: str):
-    return faiss.read_index(index_path)
+    return read_index(index_path)
 
-@st.cache_data
+@st.cache_resource
 def load_chunks(chunk_path: str):
-    with open(chunk_path, "r", encoding="utf-8") as f:
-        return [c.strip() for c in f.read().split("\n\n") if c.strip()]
+    # memory-map 청크 저장소는 복사하지 않고 세션 간에 공유
+    return open_chunks(chunk_path)
 
 def search_similar_chunks(question: str, index, chunks, model, top_k=3):
     embedding = model.encode([question])
     _, indices = index.search(np.array(embedding).astype("float32"), top_k)
-    return [chunks[i] for i in indices[0]]
+    return [chunks[i] for i in indices[0] if i >= 0]  # 결과가 top_k보다 적으면 -1 (IVF/HNSW, tombstone)
 
 def build_rag_chain():
     prompt = PromptTemplate.from_template(
@@ -0,0 +1,142 @@
+# chatbot/answer_cache.py
+# 의미 기반 답변 캐시: 이전에 답한 질문과 임베딩이 충분히 비슷하고 분류된 카테고리가 같으면
+# 전문 LLM → 챗봇 LLM 호출 없이 저장된 답변을 돌려준다 (카테고리는 전문 LLM과 context를 정하므로 키에 포함).
+# 챗봇 LLM은 세션 히스토리를 보고 답하므로 히스토리 다이제스트(context_key)가 같을 때만 적중한다
+# ("그럼 부작용은?" 같은 후속 질문이 다른 대화의 답변을 받지 않도록).
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("chatbot.answer_cache")
+
+
+def history_key(messages) -> str:
+    """대화 히스토리 메시지 목록 → 캐시 키용 다이제스트 (히스토리가 없으면 빈 문자열)"""
+    if not messages:
+        return ""
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(f"{message.type}\x00{message.content}\x00".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    정규화된 질문 임베딩을 (max_size, D) 행렬에 보관하는 작은 벡터 인덱스.
+    - 유사도 threshold 이상 + 카테고리 일치 + 히스토리 다이제스트(context_key) 일치일 때만 적중
+    - 항목마다 TTL, 가득 차면 만료 항목 → 가장 오래 안 쓴 항목(LRU) 순으로 교체
+    """
+    def __init__(self, threshold: float = 0.95, ttl: int = 86400, max_size: int = 5000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._vectors = None                        # (max_size, D), 첫 put에서 할당
+        self._expires_at = np.zeros(max_size)       # 0 = 빈 슬롯
+        self._last_used = np.zeros(max_size)
+        self._categories = [None] * max_size
+        self._context_keys = [None] * max_size
+        self._entries = [None] * max_size           # (질문, 답변)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return int(np.count_nonzero(self._expires_at > time.time()))
+
+    def lookup(self, query_emb_norm, category: str, context_key: str = ""):
+        """
+        캐시에서 답변 검색
+
+        Input:
+            query_emb_norm (np.ndarray): L2 정규화된 질문 임베딩 (D,)
+            category (str): 분류된 카테고리
+            context_key (str): 세션 히스토리 다이제스트 (history_key)
+        Return:
+            str | None: 저장된 답변 (없으면 None)
+        """
+        now = time.time()
+        with self._lock:
+            if self._vectors is None:
+                self.misses += 1
+                return None
+            sims = self._vectors @ np.asarray(query_emb_norm, dtype="float32")
+            candidates = [
+                i for i in np.flatnonzero((self._expires_at > now) & (sims >= self.threshold))
+                if self._categories[i] == category and self._context_keys[i] == context_key
+            ]
+            if not candidates:
+                self.misses += 1
+                return None
+            best = max(candidates, key=lambda i: sims[i])
+            self._last_used[best] = now
+            self.hits += 1
+            return self._entries[best][1]
+
+    def put(self, question: str, query_emb_norm, category: str, answer: str, context_key: str = ""):
+        """답변 저장. 빈 슬롯 → 만료 슬롯 → LRU 슬롯 순으로 자리를 찾는다."""
+        emb = np.asarray(query_emb_norm, dtype="float32")
+        now = time.time()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, emb.shape[0]), dtype="float32")
+            expired = np.flatnonzero(self._expires_at <= now)
+            slot = expired[0] if len(expired) else int(np.argmin(self._last_used))
+            self._vectors[slot] = emb
+            self._expires_at[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._categories[slot] = category
+            self._context_keys[slot] = context_key
+            self._entries[slot] = (question, answer)
+
+    def prewarm(self, records, encode_fn, batch_size: int = 256) -> int:
+        """
+        (질문, 카테고리, 답변, 히스토리 다이제스트) 목록으로 캐시 채우기
+        context_key가 없는 예전 로그 항목은 어떤 대화에서 나온 답변인지 알 수 없으므로 건너뛴다.
+
+        Input:
+            records (list): [{"question":..., "category":..., "answer":..., "context_key":...}, ...]
+            encode_fn: 질문 리스트 → L2 정규화된 (N, D) 임베딩 (lookup 쪽과 같은 텍스트 정규화를 거쳐야 함)
+        Return:
+            int: 채운 항목 수
+        """
+        records = [
+            r for r in records if r.get("question") and r.get("answer") and r.get("context_key") is not None
+        ][-self.max_size:]
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            embs = encode_fn([r["question"] for r in batch])
+            for record, emb in zip(batch, embs):
+                self.put(record["question"], emb, record.get("category"), record["answer"], record["context_key"])
+        return len(records)
+
+    def prewarm_from_log(self, log_path: str, encode_fn) -> int:
+        """질의 로그(jsonl)에서 캐시 채우기. 파일이 없으면 0"""
+        if not os.path.isfile(log_path):
+            return 0
+        records = []
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        count = self.prewarm(records, encode_fn)
+        logger.info("답변 캐시 prewarm", extra={"count": count, "log_path": log_path})
+        return count
+
+    def stats(self) -> dict:
+        return {"size": len(self), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+_log_lock = threading.Lock()
+
+def append_query_log(log_path: str, question: str, category: str, answer: str, context_key: str = ""):
+    """답변한 질문을 질의 로그(jsonl)에 한 줄 추가 (다음 시작 시 prewarm용)"""
+    record = {"question": question, "category": category, "answer": answer, "context_key": context_key, "ts": time.time()}
+    with _log_lock, open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
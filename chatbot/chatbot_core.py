@@ -1,85 +1,573 @@
+import time
+import asyncio
+import threading
+from collections import Counter, defaultdict, namedtuple
 import numpy as np
 import config
-from rag.vector_store import load_category_vector_db, load_vector_db_by_path
+from rag.vector_store import load_category_vector_db, get_vector_db, preload_vector_dbs, search_context, search_context_batch
 from rag.embedder import load_embedder
-from llm.category_classifier import classify_category_with_llm
+from rag.model_registry import SharedHuggingFaceEmbeddings, MINILM, memory_report
+from rag.query_context import QueryContext, embedding_cache, normalize_query
+from rag.category_classifier import KNNCategoryClassifier, classify_category
+from llm.category_classifier import classify_category_with_llm, aclassify_category_with_llm, classify_category_with_llm_batch
 from llm.router import get_llm_by_category
 from llm.responder import build_rag_chain
-from llm.chatbot_llm import chatbot_response
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
+from llm.chatbot_llm import chatbot_response, achatbot_response, stream_chatbot_response, astream_chatbot_response, chatbot_response_batch
+from chatbot.answer_cache import SemanticAnswerCache, append_query_log, history_key
+from chatbot.history import get_session_history
+from chatbot.lazy_resource import LazyResource
+from chatbot.metrics import metrics, request_scope, stage_timer, TokenUsageCallback, logger, configure_logging, start_metrics_server
 
 # ---- 초기화 ----
-embedder = load_embedder()
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-path, _ = config.VECTOR_DB_PATHS.get("treatment", config.VECTOR_DB_PATHS["default"])
-faiss_db = FAISS.load_local(
-    folder_path=path,
-    embeddings=embedding_model,
-    allow_dangerous_deserialization=True  # 직접 만든 경우에만!
-)
-
-category_texts, category_categories, category_embeddings = load_category_vector_db()
+# import 시에는 모델/벡터 DB를 로드하지 않는다. 각 리소스는 처음 쓸 때 한 번만 로드되며(LazyResource),
+# 서버 시작 직후 warmup(background=True)으로 미리 올려 둘 수 있다.
+configure_logging()
 
 # 💡 category_embeddings (N, D), normalize
 def normalize(v):
     return v / (np.linalg.norm(v, axis=-1, keepdims=True) + 1e-8)
-category_embeddings_norm = normalize(category_embeddings.numpy())
 
-def run_chatbot_pipeline(user_input: str, session_id: str = "default") -> str:
+def _load_minilm():
+    # 프로세스 공용 레지스트리의 all-MiniLM (junseok_embedder 등과 같은 인스턴스)
+    embeddings = SharedHuggingFaceEmbeddings(model_name=MINILM)
+    embeddings.model  # 모델 로드
+    return embeddings
+
+def _load_treatment_db():
+    from langchain_community.vectorstores import FAISS
+    path, _ = config.VECTOR_DB_PATHS.get("treatment", config.VECTOR_DB_PATHS["default"])
+    return FAISS.load_local(
+        folder_path=path,
+        embeddings=minilm_resource.get(),
+        allow_dangerous_deserialization=True  # 직접 만든 경우에만!
+    )
+
+CategoryDB = namedtuple("CategoryDB", ["texts", "categories", "embeddings_norm", "classifier"])
+
+def _load_category_db():
+    # 임베딩은 저장 시 이미 정규화되어 있음 (버전 포맷이면 memory-map, torch 불필요)
+    texts, categories, embeddings_norm = load_category_vector_db()
+    # 로컬 kNN 카테고리 분류기 (확신도가 낮을 때만 분류 LLM 호출)
+    classifier = None
+    if config.LOCAL_CLASSIFIER_ENABLED:
+        classifier = KNNCategoryClassifier(embeddings_norm, categories, k=config.LOCAL_CLASSIFIER_K)
+    return CategoryDB(texts, categories, embeddings_norm, classifier)
+
+def _load_answer_cache():
+    # 의미 기반 답변 캐시 (config.ANSWER_CACHE_ENABLED일 때만)
+    if not config.ANSWER_CACHE_ENABLED:
+        return None
+    cache = SemanticAnswerCache(
+        threshold=config.ANSWER_CACHE_THRESHOLD,
+        ttl=config.ANSWER_CACHE_TTL,
+        max_size=config.ANSWER_CACHE_MAX_SIZE,
+    )
+    if config.ANSWER_CACHE_LOG_PATH:
+        cache.prewarm_from_log(
+            config.ANSWER_CACHE_LOG_PATH,
+            # 조회(QueryContext)와 같은 정규화 텍스트로 임베딩해야 자기 질문과 일치한다
+            lambda texts: normalize(embedder_resource.get().encode([normalize_query(t) for t in texts], batch_size=64)),
+        )
+    metrics.register_collector("chatbot_answer_cache", cache.stats)
+    return cache
+
+embedder_resource = LazyResource("ko_embedder", load_embedder)
+minilm_resource = LazyResource("minilm_embedder", _load_minilm)
+treatment_db_resource = LazyResource("treatment_db", _load_treatment_db)
+category_db_resource = LazyResource("category_db", _load_category_db)
+answer_cache_resource = LazyResource("answer_cache", _load_answer_cache)
+# 카테고리별 벡터 DB는 rag.vector_store 레지스트리가 처음 쓸 때 한 번만 로드 (같은 파일을 쓰는 카테고리는 공유)
+vector_dbs_resource = LazyResource("vector_dbs", preload_vector_dbs)
+
+# warmup 순서 (앞쪽일수록 첫 질문에 먼저 필요)
+_warmup_order = [
+    embedder_resource,
+    category_db_resource,
+    vector_dbs_resource,
+    answer_cache_resource,
+    minilm_resource,
+    treatment_db_resource,
+]
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def warmup(background: bool = False):
+    """
+    모든 리소스를 미리 로드. background=True면 데몬 스레드에서 로드하고 바로 반환한다.
+    여러 번 호출해도 로드는 한 번만 일어난다 (Streamlit 재실행 등).
+    """
+    global _warmup_thread
+
+    def _run():
+        for resource in _warmup_order:
+            try:
+                resource.get()
+            except Exception as e:
+                logger.error("warmup failed", extra={"resource": resource.name, "error": f"{type(e).__name__}: {e}"})
+
+    if not background:
+        _run()
+        return None
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_run, name="chatbot-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+# 질문 임베딩 모델 (QueryContext가 요청당 모델별로 한 번만 호출, LRU 캐시 공유)
+query_encoders = {
+    "ko": lambda text: embedder_resource.get().encode([text])[0],            # 라우팅 + 카테고리 벡터 DB 검색
+    "minilm": lambda text: minilm_resource.get().embed_query(text),          # treatment FAISS 검색
+}
+
+# 캐시 상태는 /metrics로 내보낼 때마다 읽어 간다
+metrics.register_collector("chatbot_embedding_cache", embedding_cache.stats)
+metrics.register_collector(
+    "chatbot_model_memory_mb",
+    lambda: {
+        f"{m['model'].split('/')[-1]}_{m['device']}_{m['precision']}": m["memory_mb"]
+        for m in memory_report() if m["memory_mb"] is not None
+    },
+)
+if config.METRICS_PORT:
+    start_metrics_server(config.METRICS_PORT)
+
+def _remember_cached_turn(session_id: str, user_input: str, answer: str):
+    """캐시 적중 시에도 세션 히스토리에 질문/답변을 남긴다 (LLM 경로와 동일하게)"""
+    history = get_session_history(session_id)
+    history.add_user_message(user_input)
+    history.add_ai_message(answer)
+
+def route_query(query: QueryContext):
+    """
+    1~3단계: 질문 임베딩 → 카테고리 벡터 DB top-k 유사 예시
+
+    Return:
+        (retrieved_examples, route_category, sims)
+        retrieved_examples: [(텍스트, 카테고리, 유사도), ...] 유사도 0.5 이상만 (없으면 빈 리스트)
+        route_category: 최근접 예시의 카테고리
+        sims: 카테고리 DB 전체와의 코사인 유사도 (N,) (로컬 분류기 입력)
+    """
     # 1. 입력 임베딩 + 정규화
-    input_emb = embedder.encode([user_input])[0]  # (D,)
-    input_emb_norm = input_emb / (np.linalg.norm(input_emb) + 1e-8)
-    
-    # 2. 코사인 유사도(0~1) top-k
-    sims = np.dot(category_embeddings_norm, input_emb_norm)  # (N,)
+    with stage_timer("embed"):
+        input_emb_norm = query.normalized("ko")  # (D,)
+
+    # 2. 코사인 유사도(0~1)
+    with stage_timer("category_similarity"):
+        sims = np.dot(category_db_resource.get().embeddings_norm, input_emb_norm)  # (N,)
+        return _examples_from_sims(sims)
+
+def _examples_from_sims(sims):
+    """카테고리 DB 유사도 (N,)에서 top-k 예시와 라우팅 카테고리 추출"""
+    category_db = category_db_resource.get()
+    category_texts, category_categories = category_db.texts, category_db.categories
     top_k = 3
     top_idx = np.argsort(sims)[-top_k:][::-1]
     top_sims = sims[top_idx]
-    max_sim = top_sims[0]
-    
-    if max_sim < 0.5:
-        # context 없이 바로 챗봇 LLM에 전달
-        return chatbot_response(user_input, "", session_id=session_id)
-    
-    # 3. context 확보, 카테고리 분류 LLM
+
+    # 3. 유사도 0.5 이상인 예시만 분류 LLM의 few-shot으로 사용
     retrieved_examples = [
         (category_texts[i], category_categories[i], float(top_sims[j]))
         for j, i in enumerate(top_idx)
         if top_sims[j] >= 0.5
     ]
-    # 만약 아무것도 없으면, context 없이 바로 응답
-    if not retrieved_examples:
-        return chatbot_response(user_input, "", session_id=session_id)
-
-    predicted_category = classify_category_with_llm(user_input, retrieved_examples)
-
-    # 4. 카테고리별 벡터 DB에서 문서 재검색 (context 추출)
-    if predicted_category == "treatment":
-        results = faiss_db.similarity_search(user_input, k=3)
-        context = "\n\n".join([doc.page_content for doc in results])
-    else:
-        index_file, chunks_file = config.VECTOR_DB_PATHS.get(predicted_category, config.VECTOR_DB_PATHS["default"])
-        context_docs, context_index = load_vector_db_by_path(index_file, chunks_file)
-        doc_emb = embedder.encode([user_input])[0]
-        doc_emb_norm = doc_emb / (np.linalg.norm(doc_emb) + 1e-8)
-        context_docs_norm = np.array([c / (np.linalg.norm(c) + 1e-8) for c in context_index.reconstruct_n(0, context_index.ntotal)])
-        sims2 = np.dot(context_docs_norm, doc_emb_norm)
-
-        # 유사도 0.5 이상만 추출 (최대 3개)
-        selected_idx = [i for i in np.argsort(sims2)[::-1] if sims2[i] >= 0.5][:3]
-
-        if selected_idx:
-            top_docs = [context_docs[i] for i in selected_idx]
-            context = "\n".join(top_docs)
-        else:
-            context = ""   # 유사한 문장이 없으면 context 없이!
+    return retrieved_examples, category_categories[top_idx[0]], sims
+
+def retrieve_context(category: str, query: QueryContext) -> str:
+    """4단계: 카테고리별 벡터 DB에서 문서 재검색 (context 추출)"""
+    if category == "treatment":
+        with stage_timer("embed_minilm"):
+            minilm_emb = query.embedding("minilm")
+        with stage_timer("index_search", category=category):
+            results = treatment_db_resource.get().similarity_search_by_vector(minilm_emb.tolist(), k=3)
+        return "\n\n".join([doc.page_content for doc in results])
+
+    with stage_timer("index_load", category=category):
+        context_docs, context_index = get_vector_db(category)
+    # 정규화된 내적 인덱스에서 유사도 0.5 이상만 추출 (최대 3개)
+    with stage_timer("index_search", category=category):
+        selected = search_context(context_index, context_docs, query.normalized("ko"), top_k=3, threshold=0.5)
+    # 유사한 문장이 없으면 context 없이!
+    return "\n".join(doc for doc, _ in selected)
+
+def classify_query(user_input: str, retrieved_examples, sims) -> str:
+    """카테고리 분류: 로컬 kNN 확신도가 충분하면 그대로, 아니면 분류 LLM"""
+    local_classifier = category_db_resource.get().classifier
+    if local_classifier is None:
+        with stage_timer("classify_llm"):
+            return classify_category_with_llm(user_input, retrieved_examples)
+    with stage_timer("classify"):
+        category, confidence, method = classify_category(
+            user_input, retrieved_examples, sims, local_classifier, config.LOCAL_CLASSIFIER_THRESHOLD
+        )
+    metrics.inc("chatbot_classifier_total", method=method)
+    logger.info("category classified", extra={"category": category, "confidence": round(confidence, 3), "method": method})
+    return category
+
+def _confident_local_category(sims):
+    """로컬 kNN 확신도가 임계값 이상이면 그 카테고리, 아니면 None"""
+    local_classifier = category_db_resource.get().classifier
+    if local_classifier is None:
+        return None
+    category, confidence = local_classifier.predict_from_sims(sims)
+    method = "knn" if confidence >= config.LOCAL_CLASSIFIER_THRESHOLD else "llm"
+    metrics.inc("chatbot_classifier_total", method=method)
+    return category if method == "knn" else None
+
+def _answer_context_key(session_id: str) -> str:
+    """
+    답변 캐시 키에 넣을 세션 히스토리 다이제스트.
+    챗봇 LLM이 이번 턴을 히스토리에 추가하기 전에 계산해서 조회/저장에 같은 값을 써야 한다.
+    """
+    return history_key(get_session_history(session_id).messages)
+
+def _lookup_cached_answer(query: QueryContext, category: str, session_id: str, context_key: str):
+    """
+    비슷한 질문에 같은 대화 맥락에서 이미 답한 적이 있으면 전문 LLM / 챗봇 LLM 호출 없이 재사용
+    category는 분류 결과(전문 LLM과 context를 정하는 카테고리)
+    """
+    answer_cache = answer_cache_resource.get()
+    if answer_cache is None:
+        return None
+    cached = answer_cache.lookup(query.normalized("ko"), category, context_key)
+    metrics.inc("chatbot_answer_cache_lookups_total", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        _remember_cached_turn(session_id, query.text, cached)
+    return cached
+
+def _store_answer(query: QueryContext, category: str, answer: str, context_key: str):
+    answer_cache = answer_cache_resource.get()
+    if answer_cache is None:
+        return
+    answer_cache.put(query.text, query.normalized("ko"), category, answer, context_key)
+    if config.ANSWER_CACHE_LOG_PATH:
+        append_query_log(config.ANSWER_CACHE_LOG_PATH, query.text, category, answer, context_key)
+
+def predict_category(query: QueryContext, retrieved_examples, sims) -> str:
+    """4단계: 카테고리 분류 (전문 LLM / 답변 캐시 키에 쓰는 카테고리)"""
+    # treatment 후보가 있으면 분류를 기다리는 동안 MiniLM 임베딩을 미리 계산
+    if any(cat == "treatment" for _, cat, _ in retrieved_examples):
+        query.prefetch("minilm")
+    return classify_query(query.text, retrieved_examples, sims)
+
+def draft_expert_answer(query: QueryContext, predicted_category: str) -> str:
+    """4~5단계: 분류된 카테고리의 context 검색 → 카테고리별 전문 LLM 1차 답변"""
+    user_input = query.text
+    context = retrieve_context(predicted_category, query)
+
+    # 5. 카테고리별 전문 LLM → 1차 답변
+    category_llm = get_llm_by_category(predicted_category)
+    rag_chain = build_rag_chain(category_llm)
+    with stage_timer("expert_llm", category=predicted_category):
+        return rag_chain.invoke(
+            {"question": user_input, "context": context},
+            config={"callbacks": [TokenUsageCallback("expert_llm")]},
+        )
+
+def run_chatbot_pipeline(user_input: str, session_id: str = "default") -> str:
+    with request_scope():
+        query = QueryContext(user_input, query_encoders)
+        retrieved_examples, _, sims = route_query(query)
+
+        # 만약 유사한 예시가 없으면, context 없이 바로 챗봇 LLM에 전달
+        if not retrieved_examples:
+            with stage_timer("final_llm"):
+                return chatbot_response(user_input, "", session_id=session_id)
+
+        context_key = _answer_context_key(session_id)
+        predicted_category = predict_category(query, retrieved_examples, sims)
+        cached = _lookup_cached_answer(query, predicted_category, session_id, context_key)
+        if cached is not None:
+            return cached
+
+        expert_response = draft_expert_answer(query, predicted_category)
+
+        # 6. 최종 챗봇 LLM
+        with stage_timer("final_llm"):
+            answer = chatbot_response(user_input, expert_response, session_id=session_id)
+        _store_answer(query, predicted_category, answer, context_key)
+        return answer
+
+def _record_ttft(start: float):
+    metrics.observe("chatbot_ttft_seconds", time.perf_counter() - start)
+
+def ttft_summary() -> dict:
+    """스트리밍 time-to-first-token 요약 (건수, p50/p95/p99, 초 단위)"""
+    return metrics.histogram_summary("chatbot_ttft_seconds")
+
+def run_chatbot_pipeline_stream(user_input: str, session_id: str = "default"):
+    """
+    run_chatbot_pipeline의 스트리밍 버전. 최종 챗봇 LLM의 토큰을 도착하는 대로 yield한다.
+    (답변 캐시 적중 시에는 저장된 답변을 한 번에 yield)
+    완성된 응답은 스트림이 끝날 때 세션 히스토리에 저장된다.
+    """
+    with request_scope():
+        start = time.perf_counter()
+        query = QueryContext(user_input, query_encoders)
+        retrieved_examples, _, sims = route_query(query)
+
+        expert_response = ""
+        if retrieved_examples:
+            context_key = _answer_context_key(session_id)
+            predicted_category = predict_category(query, retrieved_examples, sims)
+            cached = _lookup_cached_answer(query, predicted_category, session_id, context_key)
+            if cached is not None:
+                _record_ttft(start)
+                yield cached
+                return
+            expert_response = draft_expert_answer(query, predicted_category)
+
+        tokens = []
+        with stage_timer("final_llm"):
+            for token in stream_chatbot_response(user_input, expert_response, session_id=session_id):
+                if not tokens:
+                    _record_ttft(start)
+                tokens.append(token)
+                yield token
+
+        if retrieved_examples:
+            _store_answer(query, predicted_category, "".join(tokens), context_key)
+
+async def apredict_category(query: QueryContext, retrieved_examples, sims):
+    """
+    predict_category의 async 버전 + context 검색 시작.
+    분류 LLM을 기다리는 동안 top-k 예시에 나온 후보 카테고리들의 context 검색을 미리 시작하고,
+    분류 결과 카테고리의 검색 task만 남기고 나머지는 취소한다.
+    임베딩/FAISS 검색은 CPU 작업이라 스레드에서 실행해 이벤트 루프를 막지 않는다.
+
+    Return:
+        (predicted_category, context_task) : 답변 캐시가 적중하면 context_task는 취소한다
+    """
+    predicted_category = _confident_local_category(sims)
+    if predicted_category is not None:
+        # 로컬 분류기로 충분하면 분류 LLM 없이 바로 검색
+        return predicted_category, asyncio.create_task(asyncio.to_thread(retrieve_context, predicted_category, query))
+
+    # 후보 카테고리별 context 검색을 분류 LLM과 동시에 실행 (추측 검색)
+    candidates = dict.fromkeys(cat for _, cat, _ in retrieved_examples)
+    speculative = {
+        cat: asyncio.create_task(asyncio.to_thread(retrieve_context, cat, query))
+        for cat in candidates
+    }
+    try:
+        with stage_timer("classify_llm"):
+            predicted_category = await aclassify_category_with_llm(query.text, retrieved_examples)
+        winner = speculative.pop(predicted_category, None)
+    finally:
+        # 이미 스레드에서 실행 중인 검색은 끝까지 돌지만 결과는 버린다
+        for task in speculative.values():
+            task.cancel()
+
+    if winner is None:
+        winner = asyncio.create_task(asyncio.to_thread(retrieve_context, predicted_category, query))
+    return predicted_category, winner
+
+async def adraft_expert_answer(query: QueryContext, predicted_category: str, context_task) -> str:
+    """draft_expert_answer의 async 버전 (context는 apredict_category가 시작한 검색 task)"""
+    context = await context_task
 
     # 5. 카테고리별 전문 LLM → 1차 답변
     category_llm = get_llm_by_category(predicted_category)
     rag_chain = build_rag_chain(category_llm)
-    expert_response = rag_chain.invoke({"question": user_input, "context": context})
+    with stage_timer("expert_llm", category=predicted_category):
+        return await rag_chain.ainvoke(
+            {"question": query.text, "context": context},
+            config={"callbacks": [TokenUsageCallback("expert_llm")]},
+        )
+
+async def arun_chatbot_pipeline(user_input: str, session_id: str = "default") -> str:
+    """run_chatbot_pipeline의 async 버전 (LangChain ainvoke + AsyncOpenAI)"""
+    with request_scope():
+        query = QueryContext(user_input, query_encoders)
+        retrieved_examples, _, sims = await asyncio.to_thread(route_query, query)
+
+        if not retrieved_examples:
+            with stage_timer("final_llm"):
+                return await achatbot_response(user_input, "", session_id=session_id)
+
+        context_key = _answer_context_key(session_id)
+        predicted_category, context_task = await apredict_category(query, retrieved_examples, sims)
+        cached = _lookup_cached_answer(query, predicted_category, session_id, context_key)
+        if cached is not None:
+            context_task.cancel()
+            return cached
+
+        expert_response = await adraft_expert_answer(query, predicted_category, context_task)
+
+        # 6. 최종 챗봇 LLM
+        with stage_timer("final_llm"):
+            answer = await achatbot_response(user_input, expert_response, session_id=session_id)
+        _store_answer(query, predicted_category, answer, context_key)
+        return answer
+
+async def arun_chatbot_pipeline_stream(user_input: str, session_id: str = "default"):
+    """run_chatbot_pipeline_stream의 async iterator 버전"""
+    with request_scope():
+        start = time.perf_counter()
+        query = QueryContext(user_input, query_encoders)
+        retrieved_examples, _, sims = await asyncio.to_thread(route_query, query)
+
+        expert_response = ""
+        if retrieved_examples:
+            context_key = _answer_context_key(session_id)
+            predicted_category, context_task = await apredict_category(query, retrieved_examples, sims)
+            cached = _lookup_cached_answer(query, predicted_category, session_id, context_key)
+            if cached is not None:
+                context_task.cancel()
+                _record_ttft(start)
+                yield cached
+                return
+            expert_response = await adraft_expert_answer(query, predicted_category, context_task)
+
+        tokens = []
+        with stage_timer("final_llm"):
+            async for token in astream_chatbot_response(user_input, expert_response, session_id=session_id):
+                if not tokens:
+                    _record_ttft(start)
+                tokens.append(token)
+                yield token
+
+        if retrieved_examples:
+            _store_answer(query, predicted_category, "".join(tokens), context_key)
+
+def _search_treatment_batch(queries: list, k: int = 3) -> list:
+    """treatment FAISS 스토어를 MiniLM 배치 임베딩 + index.search 한 번으로 검색"""
+    faiss_db = treatment_db_resource.get()
+    vectors = np.asarray([query.embedding("minilm") for query in queries], dtype="float32")
+    _, ids = faiss_db.index.search(vectors, k)
+    contexts = []
+    for row in ids:
+        docs = [faiss_db.docstore.search(faiss_db.index_to_docstore_id[i]) for i in row if i >= 0]
+        contexts.append("\n\n".join(doc.page_content for doc in docs))
+    return contexts
+
+def run_chatbot_pipeline_batch(questions: list, session_ids: list = None, max_concurrency: int = 8) -> list:
+    """
+    여러 질문을 한 번에 처리 (오프라인 평가, FAQ 일괄 생성용)
+    - 임베딩: 임베딩 LRU 캐시에 없는 질문만 SentenceTransformer.encode 한 번 (MiniLM은 treatment로 분류된 질문만)
+    - 카테고리 유사도: (Q, D) x (D, N) 행렬곱 한 번
+    - context 검색: 카테고리별로 묶어서 index.search 한 번
+    - LLM: 분류(필요한 것만) / 전문 LLM / 최종 LLM 모두 .batch()로 max_concurrency개씩 동시 실행
+
+    Input:
+        questions (list): 질문 리스트
+        session_ids (list): 질문별 세션 ID (생략 시 질문마다 별도 세션 batch-0, batch-1, ...)
+    Return:
+        list: 질문 순서대로 답변
+    """
+    if session_ids is None:
+        session_ids = [f"batch-{i}" for i in range(len(questions))]
+    if len(session_ids) != len(questions):
+        raise ValueError("questions와 session_ids의 길이가 다릅니다.")
+    if not questions:
+        return []
+
+    with request_scope():
+        return _run_batch(questions, session_ids, max_concurrency)
+
+def _seed_batch_embeddings(queries: list, name: str, encode_many, stage: str) -> list:
+    """
+    임베딩 LRU 캐시를 먼저 보고, 없는 질문(중복 제거)만 encode_many 한 번으로 계산해서 QueryContext에 넣는다.
+    Return:
+        list: 질문 순서대로 임베딩
+    """
+    found = {text: embedding_cache.get((name, text)) for text in dict.fromkeys(q.key_text for q in queries)}
+    missing = [text for text, emb in found.items() if emb is None]
+    if missing:
+        with stage_timer(stage, size=len(missing)):
+            found.update(zip(missing, encode_many(missing)))
+    for query in queries:
+        query.seed(name, found[query.key_text])
+    return [found[query.key_text] for query in queries]
+
+def _run_batch(questions: list, session_ids: list, max_concurrency: int) -> list:
+    # 1. 임베딩 한 번에 계산 (QueryContext에 넣어 두면 이후 단계에서 재계산하지 않음)
+    queries = [QueryContext(q, query_encoders) for q in questions]
+    embs = _seed_batch_embeddings(
+        queries, "ko", lambda texts: embedder_resource.get().encode(texts, batch_size=64), "batch_embed"
+    )
+
+    # 2. 카테고리 유사도 행렬곱 한 번
+    with stage_timer("batch_category_similarity", size=len(queries)):
+        sims_all = normalize(np.asarray(embs, dtype="float32")) @ category_db_resource.get().embeddings_norm.T  # (Q, N)
+        routed = [_examples_from_sims(sims) for sims in sims_all]
+
+    answers = [None] * len(questions)
+    drafts = [""] * len(questions)
+
+    # 3. 카테고리 분류: 로컬 kNN이 확신하지 못한 것만 분류 LLM (동시 실행)
+    categories = {}
+    need_llm = []
+    for i in range(len(questions)):
+        examples, _, sims = routed[i]
+        if examples:
+            category = _confident_local_category(sims)
+            if category is None:
+                need_llm.append(i)
+            else:
+                categories[i] = category
+    if need_llm:
+        with stage_timer("batch_classify_llm", size=len(need_llm)):
+            labels = classify_category_with_llm_batch(
+                [questions[i] for i in need_llm], [routed[i][0] for i in need_llm], max_concurrency=max_concurrency
+            )
+        categories.update(zip(need_llm, labels))
+
+    # 답변 캐시 (분류 카테고리 + 히스토리 다이제스트가 같아야 적중)
+    # 히스토리 다이제스트는 배치 시작 시점 기준이라, 같은 세션이 여러 번 나오면
+    # 두 번째 이후 질문은 앞 회차가 히스토리에 추가된 뒤 답변되어 키가 맞지 않는다 → 그런 세션은 캐시를 쓰지 않음
+    session_counts = Counter(session_ids)
+    context_keys = [
+        _answer_context_key(session_id) if session_counts[session_id] == 1 else None for session_id in session_ids
+    ]
+    pending = []    # LLM 경로로 가는 질문 번호
+    for i, query in enumerate(queries):
+        if i in categories and context_keys[i] is not None:
+            cached = _lookup_cached_answer(query, categories[i], session_ids[i], context_keys[i])
+            if cached is not None:
+                answers[i] = cached
+                continue
+        pending.append(i)
+
+    # 4. 카테고리별로 묶어서 검색 + 전문 LLM .batch()
+    groups = defaultdict(list)
+    for i in pending:
+        if i in categories:
+            groups[categories[i]].append(i)
+
+    for category, members in groups.items():
+        with stage_timer("batch_index_search", category=category, size=len(members)):
+            if category == "treatment":
+                _seed_batch_embeddings(
+                    [queries[i] for i in members], "minilm", minilm_resource.get().embed_documents, "batch_embed_minilm"
+                )
+                contexts = _search_treatment_batch([queries[i] for i in members])
+            else:
+                context_docs, context_index = get_vector_db(category)
+                selected = search_context_batch(
+                    context_index, context_docs, [queries[i].normalized("ko") for i in members], top_k=3, threshold=0.5
+                )
+                contexts = ["\n".join(doc for doc, _ in rows) for rows in selected]
+
+        rag_chain = build_rag_chain(get_llm_by_category(category))
+        with stage_timer("batch_expert_llm", category=category, size=len(members)):
+            outputs = rag_chain.batch(
+                [{"question": questions[i], "context": context} for i, context in zip(members, contexts)],
+                config={"max_concurrency": max_concurrency, "callbacks": [TokenUsageCallback("expert_llm")]},
+            )
+        for i, output in zip(members, outputs):
+            drafts[i] = output
 
-    # 6. 최종 챗봇 LLM
-    return chatbot_response(user_input, expert_response, session_id=session_id)
+    # 5. 최종 챗봇 LLM .batch()
+    with stage_timer("batch_final_llm", size=len(pending)):
+        finals = chatbot_response_batch(
+            [questions[i] for i in pending],
+            [drafts[i] for i in pending],
+            [session_ids[i] for i in pending],
+            max_concurrency=max_concurrency,
+        )
+    for i, answer in zip(pending, finals):
+        answers[i] = answer
+        if i in categories and context_keys[i] is not None:
+            _store_answer(queries[i], categories[i], answer, context_keys[i])
+    return answers
@@ -0,0 +1,37 @@
+# chatbot/lazy_resource.py
+# 무거운 리소스(임베딩 모델, 벡터 DB 등)를 처음 쓸 때 한 번만 로드하는 스레드 안전 래퍼
+
+import time
+import threading
+from chatbot.metrics import metrics, logger
+
+
+class LazyResource:
+    """
+    loader()를 처음 get() 할 때 한 번만 실행하고 결과를 재사용한다.
+    여러 스레드가 동시에 get() 해도 loader는 한 번만 실행된다 (나머지는 완료를 기다림).
+    로드 시간은 chatbot_init_seconds{resource=...}에 기록된다.
+    """
+    def __init__(self, name: str, loader):
+        self.name = name
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                self._value = self._loader()
+                self._loaded = True
+                elapsed = time.perf_counter() - start
+                metrics.observe("chatbot_init_seconds", elapsed, resource=self.name)
+                logger.info("resource loaded", extra={"resource": self.name, "duration_ms": round(elapsed * 1000, 2)})
+        return self._value
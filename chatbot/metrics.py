@@ -0,0 +1,246 @@
+# chatbot/metrics.py
+# 챗봇 파이프라인 계측 : 단계별 소요 시간(요청 ID 포함), LLM 토큰 수, 캐시 적중 카운터
+# - 단계별 히스토그램(p50/p95/p99)과 카운터를 모아 Prometheus 텍스트 / JSON으로 내보낸다.
+# - 로그는 print 대신 JSON 한 줄짜리 구조화 로그 (logger "chatbot")
+
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger("chatbot")
+
+# 현재 처리 중인 요청 ID (스레드/asyncio 태스크로 자동 전파)
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+
+class JsonFormatter(logging.Formatter):
+    """로그 레코드를 JSON 한 줄로 출력 (extra로 넘긴 필드 포함)"""
+    _skip = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", request_id_var.get()),
+        }
+        payload.update({k: v for k, v in vars(record).items() if k not in self._skip and k not in payload})
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=logging.INFO):
+    """chatbot 로거에 JSON 핸들러 연결 (이미 연결돼 있으면 그대로)"""
+    if not any(isinstance(h.formatter, JsonFormatter) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+class Histogram:
+    """최근 max_samples개 관측값으로 분위수를 계산하는 히스토그램 (count/sum은 누적)"""
+    def __init__(self, max_samples: int = 2048):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {"count": self.count, "sum": self.sum, "p50": None, "p95": None, "p99": None}
+        p50, p95, p99 = np.percentile(np.fromiter(self.samples, dtype=float), [50, 95, 99])
+        return {"count": self.count, "sum": self.sum, "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+class MetricsRegistry:
+    """
+    이름 + 라벨 단위 히스토그램/카운터 저장소.
+    collectors에 등록한 함수는 내보낼 때마다 호출되어 게이지 값(캐시 크기, 적중 수 등)을 돌려준다.
+    """
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.collectors = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            self.histograms.setdefault(self._key(name, labels), Histogram()).observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            key = self._key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def register_collector(self, name: str, fn):
+        """fn() -> {필드: 숫자} ; name_필드 게이지로 내보냄"""
+        self.collectors[name] = fn
+
+    def histogram_summary(self, name: str, **labels) -> dict:
+        with self._lock:
+            hist = self.histograms.get(self._key(name, labels))
+            return hist.summary() if hist else Histogram().summary()
+
+    def _gauges(self):
+        gauges = {}
+        for name, fn in list(self.collectors.items()):
+            try:
+                values = fn() or {}
+            except Exception as e:
+                logger.warning("metrics collector failed", extra={"collector": name, "error": str(e)})
+                continue
+            for field, value in values.items():
+                if isinstance(value, (int, float)):
+                    gauges[re.sub(r"[^a-zA-Z0-9_]", "_", f"{name}_{field}")] = value
+        return gauges
+
+    def snapshot(self) -> dict:
+        """JSON용 전체 스냅샷"""
+        with self._lock:
+            histograms = [{"name": n, "labels": dict(l), **h.summary()} for (n, l), h in self.histograms.items()]
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self.counters.items()]
+        return {"histograms": histograms, "counters": counters, "gauges": self._gauges()}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (히스토그램은 summary 타입 + quantile 라벨)"""
+        def fmt_labels(labels, extra=None):
+            items = list(labels) + list((extra or {}).items())
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        with self._lock:
+            hist_items = sorted(self.histograms.items())
+            counter_items = sorted(self.counters.items())
+        typed = set()
+        for (name, labels), hist in hist_items:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            summary = hist.summary()
+            for q in ("p50", "p95", "p99"):
+                if summary[q] is not None:
+                    lines.append(f"{name}{fmt_labels(labels, {'quantile': '0.' + q[1:]})} {summary[q]}")
+            lines.append(f"{name}_count{fmt_labels(labels)} {summary['count']}")
+            lines.append(f"{name}_sum{fmt_labels(labels)} {summary['sum']}")
+        for (name, labels), value in counter_items:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{fmt_labels(labels)} {value}")
+        for name, value in sorted(self._gauges().items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def request_scope(request_id: str = None):
+    """파이프라인 요청 하나의 범위. 요청 ID를 만들고 전체 소요 시간을 기록한다."""
+    request_id = request_id or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    try:
+        yield request_id
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("chatbot_request_seconds", elapsed)
+        logger.info("request done", extra={"stage": "total", "duration_ms": round(elapsed * 1000, 2)})
+        try:
+            request_id_var.reset(token)
+        except ValueError:
+            # 스트리밍 제너레이터가 다른 컨텍스트에서 닫힌 경우
+            pass
+
+
+@contextmanager
+def stage_timer(stage: str, **fields):
+    """단계 소요 시간을 chatbot_stage_seconds{stage=...}에 기록하고 구조화 로그를 남긴다."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("chatbot_stage_seconds", elapsed, stage=stage)
+        logger.debug("stage done", extra={"stage": stage, "duration_ms": round(elapsed * 1000, 2), **fields})
+
+
+def record_token_usage(stage: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+    """LLM 호출 한 번의 토큰 수 기록"""
+    metrics.inc("chatbot_llm_calls_total", stage=stage)
+    metrics.inc("chatbot_llm_tokens_total", prompt_tokens, stage=stage, type="prompt")
+    metrics.inc("chatbot_llm_tokens_total", completion_tokens, stage=stage, type="completion")
+    logger.debug("llm usage", extra={"stage": stage, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LangChain 체인 호출의 토큰 사용량을 stage 이름으로 기록하는 콜백"""
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        if not usage:
+            # 스트리밍 등 llm_output이 없는 경우 메시지의 usage_metadata 사용
+            for generations in response.generations:
+                for gen in generations:
+                    meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                    prompt += meta.get("input_tokens", 0)
+                    completion += meta.get("output_tokens", 0)
+        record_token_usage(self.stage, prompt, completion)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(metrics.snapshot(), ensure_ascii=False), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """/metrics (Prometheus), /metrics.json 을 제공하는 HTTP 서버를 백그라운드 스레드로 시작 (프로세스당 1회)"""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("metrics server started", extra={"host": host, "port": port})
+    return _server
@@ -25,7 +25,7 @@ JSON_PATHS = {
 # 벡터 DB 저장 경로
 VECTOR_DB_PATH = os.path.join(BASE_DIR, "vector_db")
 FAISS_INDEX_FILE = os.path.join(VECTOR_DB_PATH, "faiss_index.faiss")
-DOC_EMBEDDINGS_FILE = os.path.join(VECTOR_DB_PATH, "doc_embeddings.pkl")
+DOC_EMBEDDINGS_FILE = os.path.join(VECTOR_DB_PATH, "doc_embeddings.npy")
 ...
 
 # 4. 카테고리별 벡터DB 경로 (확장 및 병합 지원)
@@ -59,4 +59,22 @@ VECTOR_DB_PATHS = {
          os.path.join(VECTOR_DB_PATH, "QA_random_pair_part2_index1.index"),
          os.path.join(VECTOR_DB_PATH, "QA_random_pair_part2_chunks1.txt"),
      )
-}
\ No newline at end of file
+}
+
+# 5. 쿼리 임베딩 LRU 캐시 (정규화된 질문 텍스트 기준, 모델별 최대 항목 수)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+
+# 6. 의미 기반 답변 캐시 (비슷한 질문 + 같은 라우팅 카테고리면 저장된 답변 재사용)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))   # 코사인 유사도
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))                # 초
+ANSWER_CACHE_MAX_SIZE = int(os.getenv("ANSWER_CACHE_MAX_SIZE", "5000"))
+ANSWER_CACHE_LOG_PATH = os.getenv("ANSWER_CACHE_LOG_PATH", "")                # 질의 로그(jsonl), 시작 시 prewarm + 새 답변 기록
+
+# 7. 로컬(kNN) 카테고리 분류기 : 확신도가 임계값 미만일 때만 분류 LLM 호출
+LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "true").lower() == "true"
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.8"))
+LOCAL_CLASSIFIER_K = int(os.getenv("LOCAL_CLASSIFIER_K", "10"))
+
+# 8. 파이프라인 계측 : /metrics(Prometheus), /metrics.json 포트 (0이면 서버 끄기)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
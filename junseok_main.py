@@ -1,6 +1,6 @@
 
-from preprocessing.preprocess import load_all_documents, chunk_documents
-from rag.vector_store import build_faiss_index
+from preprocessing.junseok_preprocess import load_all_documents, chunk_documents
+from rag.junseok_vector_store import build_faiss_index
 
 if __name__ == "__main__":
     # 문서 로딩 및 전처리
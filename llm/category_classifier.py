@@ -1,14 +1,20 @@
 # ✅ llm/category_classifier.py
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from langchain_openai import ChatOpenAI
+from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 import os
+from chatbot.metrics import record_token_usage, TokenUsageCallback
 
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# 배치 분류용 (run_chatbot_pipeline_batch) : 같은 모델/온도를 LangChain .batch()로 호출
+classifier_chain = ChatOpenAI(model="gpt-4o-mini", temperature=0.2) | StrOutputParser()
 
-# ✅ 카테고리 분류 전용 LLM 호출 함수
-def classify_category_with_llm(input_text, retrieved_examples):
+# ✅ 분류 프롬프트 구성 (동기/비동기 공용)
+def build_category_prompt(input_text, retrieved_examples):
     """
     retrieved_examples: List of (text, category, score)
     """
@@ -45,6 +51,15 @@ def classify_category_with_llm(input_text, retrieved_examples):
 입력 텍스트: "{input_text}"
 
 정답 카테고리:"""
+    return prompt
+
+
+# ✅ 카테고리 분류 전용 LLM 호출 함수
+def classify_category_with_llm(input_text, retrieved_examples):
+    """
+    retrieved_examples: List of (text, category, score)
+    """
+    prompt = build_category_prompt(input_text, retrieved_examples)
 
     response = client.chat.completions.create(
         model="gpt-4o-mini",
@@ -53,5 +68,38 @@ def classify_category_with_llm(input_text, retrieved_examples):
         ],
         temperature=0.2,
     )
+    if response.usage is not None:
+        record_token_usage("classify_llm", response.usage.prompt_tokens, response.usage.completion_tokens)
+
+    return response.choices[0].message.content.strip()
+
+
+# ✅ async 버전 (arun_chatbot_pipeline용)
+async def aclassify_category_with_llm(input_text, retrieved_examples):
+    prompt = build_category_prompt(input_text, retrieved_examples)
+
+    response = await async_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+    )
+    if response.usage is not None:
+        record_token_usage("classify_llm", response.usage.prompt_tokens, response.usage.completion_tokens)
+
+    return response.choices[0].message.content.strip()
+
 
-    return response.choices[0].message.content.strip()
\ No newline at end of file
+# ✅ 배치 버전 (run_chatbot_pipeline_batch용) : .batch()로 max_concurrency개씩 동시에 분류
+def classify_category_with_llm_batch(input_texts, retrieved_examples_list, max_concurrency=8):
+    """
+    input_texts: 질문 리스트
+    retrieved_examples_list: 질문별 List of (text, category, score)
+    """
+    prompts = [build_category_prompt(text, examples) for text, examples in zip(input_texts, retrieved_examples_list)]
+    outputs = classifier_chain.batch(
+        prompts,
+        config={"max_concurrency": max_concurrency, "callbacks": [TokenUsageCallback("classify_llm")]},
+    )
+    return [output.strip() for output in outputs]
@@ -6,8 +6,9 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from chatbot.history import get_session_history
+from chatbot.metrics import TokenUsageCallback
 
-chatbot_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+chatbot_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, stream_usage=True)  # 스트리밍 시에도 토큰 사용량 수신
 
 chatbot_prompt = ChatPromptTemplate.from_messages([
     ("system", """
@@ -38,5 +39,58 @@ chatbot_with_history = RunnableWithMessageHistory(
 def chatbot_response(question: str, draft_answer: str, session_id: str = "default") -> str:
     return chatbot_with_history.invoke(
         {"question": question, "draft_answer": draft_answer},
-        config={"configurable": {"session_id": session_id}}
+        config={"configurable": {"session_id": session_id}, "callbacks": [TokenUsageCallback("final_llm")]}
     )
+
+async def achatbot_response(question: str, draft_answer: str, session_id: str = "default") -> str:
+    return await chatbot_with_history.ainvoke(
+        {"question": question, "draft_answer": draft_answer},
+        config={"configurable": {"session_id": session_id}, "callbacks": [TokenUsageCallback("final_llm")]}
+    )
+
+def stream_chatbot_response(question: str, draft_answer: str, session_id: str = "default"):
+    """
+    최종 응답을 토큰 단위로 yield. 스트림이 끝나면 완성된 메시지가 세션 히스토리에 저장된다.
+    """
+    yield from chatbot_with_history.stream(
+        {"question": question, "draft_answer": draft_answer},
+        config={"configurable": {"session_id": session_id}, "callbacks": [TokenUsageCallback("final_llm")]}
+    )
+
+async def astream_chatbot_response(question: str, draft_answer: str, session_id: str = "default"):
+    async for token in chatbot_with_history.astream(
+        {"question": question, "draft_answer": draft_answer},
+        config={"configurable": {"session_id": session_id}, "callbacks": [TokenUsageCallback("final_llm")]}
+    ):
+        yield token
+
+def chatbot_response_batch(questions: list, draft_answers: list, session_ids: list, max_concurrency: int = 8) -> list:
+    """
+    여러 질문의 최종 응답을 .batch()로 동시에 생성 (max_concurrency개씩).
+    같은 세션 ID가 여러 번 나오면 히스토리 순서가 섞이지 않도록 같은 세션은 서로 다른 회차로 나눠 실행한다.
+    """
+    answers = [None] * len(questions)
+    waves = []          # 회차별 질문 번호 (같은 회차 안에서는 세션이 겹치지 않음)
+    seen = {}
+    for i, session_id in enumerate(session_ids):
+        wave = seen.get(session_id, 0)
+        seen[session_id] = wave + 1
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append(i)
+
+    for wave in waves:
+        outputs = chatbot_with_history.batch(
+            [{"question": questions[i], "draft_answer": draft_answers[i]} for i in wave],
+            config=[
+                {
+                    "configurable": {"session_id": session_ids[i]},
+                    "max_concurrency": max_concurrency,
+                    "callbacks": [TokenUsageCallback("final_llm")],
+                }
+                for i in wave
+            ],
+        )
+        for i, output in zip(wave, outputs):
+            answers[i] = output
+    return answers
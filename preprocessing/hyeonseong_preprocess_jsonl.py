@@ -4,13 +4,17 @@
 # 최초 작성일 : 2025-06-02
 # 최초 작성자 : 손현성 
 
+import io
 import os
 import re
+import codecs
 import gdown
 import tarfile
 import subprocess
 import json
 import shutil
+from functools import partial
+from preprocessing.parallel_loader import iter_json_files, LoadReport
 
 # 따로 cofig 파일로 빼는것이 좋아보임
 file_name_and_path = {
@@ -182,7 +186,7 @@ class DataDownLoad:
     
     def load_txt_file(self, file_name='merged_data.txt', split_word='\n\n'):
         """
-        txt파일 불러오기
+        txt파일 불러오기 (전체 list, 큰 파일은 iter_txt_blocks 사용 권장)
 
         Input:
             file_name = 불어올 txt파일명
@@ -190,14 +194,77 @@ class DataDownLoad:
         Return:
             contents = 불러온 data의 content list
         """
-        output_txt_path = os.path.join(self.extract_base_dir, file_name)  
-        with open(output_txt_path, 'r', encoding='utf-8') as f:
-            raw_text = f.read()
-        
-        contents = [block.strip() for block in raw_text.split(split_word) if block.strip()]
+        contents = list(self.iter_txt_blocks(file_name, split_word))
         print(f"총 {len(contents)}개의 블록이 분리되었습니다.")
         return contents
     
+    def iter_txt_blocks(self, file_name='merged_data.txt', split_word='\n\n', start=0, end=None, buffer_size=1 << 20):
+        """
+        txt파일을 buffer_size 바이트씩 읽으며 블록을 하나씩 돌려주는 제너레이터 (메모리 ≈ 버퍼 + 가장 긴 블록)
+        텍스트 모드(newline=None)와 같이 \r\n / \r 줄바꿈을 \n으로 바꾼 뒤 나누므로 블록 경계는 load_txt_file과 같다.
+        start/end(바이트 위치)를 주면 그 구간만 읽는다 (txt_block_shards 참고)
+
+        Input:
+            file_name = 불어올 txt파일명
+            split_word = content 분류 기준
+            start, end = 읽을 바이트 구간 (end=None이면 파일 끝까지)
+        """
+        output_txt_path = os.path.join(self.extract_base_dir, file_name)
+        # 텍스트 모드 파일 객체가 쓰는 것과 같은 디코더 (버퍼 경계에 걸친 \r\n, 멀티바이트 문자 처리)
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+        with open(output_txt_path, 'rb') as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            pending = ''
+            while True:
+                buffer = f.read(buffer_size if remaining is None else min(buffer_size, remaining))
+                if remaining is not None:
+                    remaining -= len(buffer)
+                final = not buffer or remaining == 0
+                pending += decoder.decode(buffer, final=final)
+                *blocks, pending = pending.split(split_word)
+                for block in blocks:
+                    block = block.strip()
+                    if block:
+                        yield block
+                if final:
+                    break
+            block = pending.strip()
+            if block:
+                yield block
+
+    def txt_block_shards(self, file_name='merged_data.txt', num_shards=4, split_word='\n\n'):
+        """
+        txt파일을 블록 경계(split_word 바로 뒤)에 맞춘 num_shards개의 바이트 구간으로 나누기
+        split_word의 줄바꿈은 \n / \r\n / \r 모두 경계로 인정 (텍스트 모드와 같음)
+        각 구간을 iter_txt_blocks(start=, end=)로 워커마다 따로 읽으면 전체를 나눠 읽은 것과 같은 블록이 나온다.
+
+        Return:
+            [(start, end), ...] 바이트 구간 리스트
+        """
+        output_txt_path = os.path.join(self.extract_base_dir, file_name)
+        separator = re.compile(rb'(?:\r\n|\r(?!\n)|\n)'.join(re.escape(part.encode('utf-8')) for part in split_word.split('\n')))
+        size = os.path.getsize(output_txt_path)
+        boundaries = [0]
+        with open(output_txt_path, 'rb') as f:
+            for i in range(1, num_shards):
+                position = max(size * i // num_shards, boundaries[-1])
+                f.seek(position)
+                # 다음 구분자를 찾을 때까지 조금씩 읽음 (끝이 \r이면 뒤에 \n이 올 수 있으므로 더 읽고 판단)
+                window = b''
+                while True:
+                    chunk = f.read(1 << 16)
+                    window += chunk
+                    found = separator.search(window)
+                    if found and (found.end() < len(window) or not chunk):
+                        boundaries.append(position + found.end())
+                        break
+                    if not chunk:
+                        boundaries.append(size)
+                        break
+        boundaries.append(size)
+        return [(a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+
     def merge_content_download(self, path_info:str=merged_data_dict):
         """
         원천데이터에서 content만 추출한 데이터 다운로드드
@@ -205,6 +272,19 @@ class DataDownLoad:
         id_info = self.extract_file_id(path_info)
         self.file_download(id_info)
 
+def extract_content(json_path, data, data_key="content"):
+    """
+    JSON 하나에서 data_key 값 추출 (최상위 또는 data 아래), 없으면 None
+    병렬 로더 워커에서 실행되므로 모듈 최상위 함수로 둔다.
+    """
+    if data_key in data:
+        content = data[data_key]
+    elif "data" in data and data_key in data["data"]:
+        content = data["data"][data_key]
+    else:
+        content = None
+    return content or None
+
 class DataPreprocessing:
     """
     필요한 data에서 content만 추출하여 병합
@@ -218,46 +298,69 @@ class DataPreprocessing:
         """
         self.extract_base_dir = extract_base_dir
 
-    def get_merge_data(self, search_directory_name='TS_국문', file_name='merged_data.txt', data_key="content"):
+    def find_json_files(self, search_directory_name='TS_국문') -> list:
+        """
+        디렉토리명에 search_directory_name이 들어간 폴더의 JSON 파일 경로 리스트
+        """
+        json_paths = []
+        for folder_name in os.listdir(self.extract_base_dir):
+            folder_path = os.path.join(self.extract_base_dir, folder_name)
+            if os.path.isdir(folder_path) and search_directory_name in folder_name:
+                for file_name in os.listdir(folder_path):
+                    if file_name.endswith('.json'):
+                        json_paths.append(os.path.join(folder_path, file_name))
+        return json_paths
+
+    def iter_merge_data(self, search_directory_name='TS_국문', data_key="content", workers=None, ordered=True, report=None):
+        """
+        TS_국문 디렉토리 안의 JSON에서 content를 파싱되는 대로 하나씩 돌려주는 제너레이터
+
+        Input:
+            search_directory_name = 디렉토리명에서 찾을 단어
+            data_key = 추출할 value값의 key 값
+            workers = JSON 파싱 프로세스 수 (None이면 CPU 수, 1이면 순차)
+            ordered = True면 파일 순서 유지 (False면 끝나는 순서대로, 더 빠름)
+            report = 통계를 채울 LoadReport (None이면 새로 만듦)
+        """
+        yield from iter_json_files(
+            self.find_json_files(search_directory_name),
+            extract=partial(extract_content, data_key=data_key),
+            workers=workers,
+            ordered=ordered,
+            report=report,
+        )
+
+    def get_merge_data(self, search_directory_name='TS_국문', file_name='merged_data.txt', data_key="content",
+                       workers=None, ordered=True, return_contents=False):
         """
         TS_국문 디렉토리 안에 있는 데이터 병합
+        content는 파싱되는 대로 바로 파일에 쓰고(임시 파일 → 완료 후 교체), 전체를 메모리에 모으지 않는다.
 
         Input:
             search_directory_name = 디렉토리명에서 찾을 단어
             file_name = 생성할 병합 데이터 파일명 
             data_key = 추출할 value값의 key 값
+            workers = JSON 파싱 프로세스 수 (None이면 CPU 수, 1이면 순차)
+            ordered = True면 파일 순서 유지 (False면 끝나는 순서대로, 더 빠름)
+            return_contents = True면 content list도 메모리에 모아서 반환 (전체 말뭉치가 메모리에 올라가므로 필요할 때만)
         Return:
-            all_contents = 병합한 content list
+            count = 저장한 content 수 (return_contents=True면 병합한 content list)
         """
         output_txt_path = os.path.join(self.extract_base_dir, file_name)
-        all_contents = []
-        
-        for folder_name in os.listdir(self.extract_base_dir):
-            folder_path = os.path.join(self.extract_base_dir, folder_name)
-
-            if os.path.isdir(folder_path) and search_directory_name in folder_name:
-                for file_name in os.listdir(folder_path):
-                    if file_name.endswith('.json'):
-                        json_path = os.path.join(folder_path, file_name)
-                        try:
-                            with open(json_path, 'r', encoding='utf-8-sig') as f:
-                                data = json.load(f)
-                                if data_key in data:
-                                    content = data[data_key]
-                                elif "data" in data and data_key in data["data"]:
-                                    content = data["data"][data_key]
-                                else:
-                                    content = None
-
-                                if content:
-                                    all_contents.append(content)
-                        except Exception as e:
-                            print(f"오류: {json_path} → {type(e).__name__}: {e}")
+        tmp_path = output_txt_path + '.tmp'
+        all_contents = [] if return_contents else None
+        report = LoadReport(0)
+        count = 0
 
         # 파일 저장
-        with open(output_txt_path, 'w', encoding='utf-8') as out_file:
-            for content in all_contents:
+        with open(tmp_path, 'w', encoding='utf-8') as out_file:
+            for content in self.iter_merge_data(search_directory_name, data_key, workers, ordered, report):
                 out_file.write(content.strip() + '\n\n')
+                count += 1
+                if return_contents:
+                    all_contents.append(content)
+        os.replace(tmp_path, output_txt_path)
 
-        print(f"완료: {len(all_contents)}개의 content가 '{output_txt_path}'에 저장되었습니다.")
-        return all_contents
+        report.print_summary()
+        print(f"완료: {count}개의 content가 '{output_txt_path}'에 저장되었습니다.")
+        return all_contents if return_contents else count
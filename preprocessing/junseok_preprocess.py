@@ -1,10 +1,9 @@
 import os
-import json
 import re
-from tqdm import tqdm
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from config import INPUT_DIR, OUTPUT_DIR
+from junseok_config import INPUT_DIR, OUTPUT_DIR
+from preprocessing.parallel_loader import load_json_files, read_json_file
 
 
 def clean_text(raw_text: str) -> str:
@@ -25,12 +24,14 @@ def find_all_json_files(root_dir):
 
 def load_and_process_json(filepath):
     try:
-        with open(filepath, encoding="utf-8-sig") as f:
-            data = json.load(f)
+        data = read_json_file(filepath)
     except Exception as e:
         print(f"Error loading {filepath}: {e}")
         return None
+    return document_from_json(filepath, data)
 
+
+def document_from_json(filepath, data):
     raw_text = data.get("content", "")
     cleaned = clean_text(raw_text)
 
@@ -70,16 +71,15 @@ def save_processed_text(doc: Document, base_dir=None):
         f.write(doc.page_content)
 
 
-def load_all_documents(input_dir=INPUT_DIR):
+def load_all_documents(input_dir=INPUT_DIR, workers=None, ordered=True):
     json_paths = find_all_json_files(input_dir)
     print(f"Found {len(json_paths)} JSON files.")
 
-    docs = []
-    for path in tqdm(json_paths, desc="Loading documents"):
-        doc = load_and_process_json(path)
-        if doc:
-            save_processed_text(doc)
-            docs.append(doc)
+    # 파일 읽기 + 파싱 + Document 변환은 프로세스 풀에서 병렬로 (preprocessing/parallel_loader.py)
+    docs, _ = load_json_files(json_paths, extract=document_from_json, workers=workers, ordered=ordered,
+                              desc="Loading documents")
+    for doc in docs:
+        save_processed_text(doc)
 
     return docs
 
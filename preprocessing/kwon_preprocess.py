@@ -1,11 +1,79 @@
 from pathlib import Path
+from collections import Counter
 import json
 import chardet
-from tqdm import tqdm
+from preprocessing.parallel_loader import load_json_files
 
-def load_all_jsons_from_path(path, max_files=None):
+# 인코딩 판별 단계 : utf-8(-sig) → cp949 → (폴더 캐시) → chardet(앞부분 CHARDET_PREFIX_BYTES만)
+# cp949는 euc-kr의 상위 집합이라 euc-kr 파일도 여기서 풀린다.
+# utf-8을 항상 먼저 시도하는 이유 : cp949는 utf-8 바이트도 깨진 글자로 디코딩해 버릴 수 있어서 순서를 바꾸면 안전하지 않음
+# 폴더 캐시는 cp949 다음 : windows-1252 같은 1바이트 인코딩은 아무 바이트나 오류 없이 디코딩하므로
+# 캐시가 앞에 있으면 같은 폴더의 cp949 파일이 전부 깨진 글자가 된다. 한글을 표현할 수 없는 인코딩은 캐시하지 않음
+CHARDET_PREFIX_BYTES = 64 * 1024
+_dir_encoding_cache = {}  # 폴더 → chardet으로 찾은 인코딩 (워커 프로세스별)
+
+def _decode(raw_bytes, encoding):
+    try:
+        return raw_bytes.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+def _can_encode_hangul(encoding):
+    try:
+        "가".encode(encoding)
+        return True
+    except (UnicodeEncodeError, LookupError):
+        return False
+
+def decode_tiered(raw_bytes, directory=None):
+    """
+    바이트를 단계별로 디코딩
+
+    Return:
+        (텍스트, 사용한 단계) 단계 = "utf-8" | "cp949" | "dir_cache" | "chardet" | "fallback"
+    """
+    text = _decode(raw_bytes, "utf-8-sig")
+    if text is not None:
+        return text, "utf-8"
+
+    text = _decode(raw_bytes, "cp949")
+    if text is not None:
+        return text, "cp949"
+
+    cached = _dir_encoding_cache.get(directory)
+    if cached:
+        text = _decode(raw_bytes, cached)
+        if text is not None:
+            return text, "dir_cache"
+
+    encoding = chardet.detect(raw_bytes[:CHARDET_PREFIX_BYTES])["encoding"]
+    text = _decode(raw_bytes, encoding) if encoding else None
+    if text is not None:
+        # 같은 폴더의 파일은 보통 인코딩이 같으므로 다음 파일부터는 chardet 없이 먼저 시도
+        if _can_encode_hangul(encoding):
+            _dir_encoding_cache[directory] = encoding
+        return text, "chardet"
+    return raw_bytes.decode("utf-8", errors="replace"), "fallback"
+
+def read_json_detect_encoding(json_file):
+    """
+    단계별 인코딩 판별로 JSON 파일 하나 읽기 (병렬 로더 워커에서 실행)
+
+    Return:
+        (데이터, 사용한 디코딩 단계)
+    """
+    json_file = Path(json_file)
+    text, tier = decode_tiered(json_file.read_bytes(), str(json_file.parent))
+    return json.loads(text), tier
+
+def _keep_with_tier(path, data_and_tier):
+    return data_and_tier
+
+def load_all_jsons_from_path(path, max_files=None, workers=None, ordered=True):
     """
     지정된 경로에서 모든 JSON 파일을 재귀적으로 읽어 리스트로 반환.
+    파일 읽기/파싱은 프로세스 풀로 병렬 처리 (preprocessing/parallel_loader.py)
+    디코딩 단계별 파일 수를 마지막에 출력
     """
     path = Path(path)
     if not path.exists():
@@ -15,16 +83,12 @@ def load_all_jsons_from_path(path, max_files=None):
     if max_files is not None:
         json_files = json_files[:max_files]
 
-    all_data = []
-    for json_file in tqdm(json_files, desc="파일 로딩 중"):
-        try:
-            raw_bytes = json_file.read_bytes()
-            encoding = chardet.detect(raw_bytes)["encoding"] or "utf-8"
-            data = json.loads(raw_bytes.decode(encoding))
-            all_data.append(data)
-        except Exception as e:
-            print(f"[오류] {json_file.name} 파일 로드 실패: {e}")
-    return all_data
+    results, _ = load_json_files(
+        json_files, extract=_keep_with_tier, reader=read_json_detect_encoding, workers=workers, ordered=ordered
+    )
+    tier_counts = Counter(tier for _, tier in results)
+    print(f"디코딩 단계별 파일 수 : {dict(tier_counts)}")
+    return [data for data, _ in results]
 
 # 2. 카테고리별 샘플 데이터 준비 (전처리 포함)
 def prepare_category_db(data_list, category):
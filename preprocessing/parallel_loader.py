@@ -0,0 +1,135 @@
+# 여러 전처리 모듈이 같이 쓰는 병렬 JSON 로더
+# AI-Hub 원천데이터처럼 작은 JSON 파일 수십만 개를 프로세스 풀로 나눠 읽고 파싱한다.
+# - 파일별 추출 로직(extract)은 각 모듈의 함수를 그대로 넘김 (모듈 최상위 함수여야 함 : 워커로 pickle 전달)
+# - ordered=False면 끝나는 순서대로 받아 더 빠름, chunksize개씩 묶어서 워커에 전달
+# - orjson이 설치되어 있으면 JSON 파싱에 사용 (없으면 표준 json)
+# - 끝나면 files/s, 실패 건수를 출력하고 LoadReport로 돌려줌
+# Windows(spawn)에서는 호출하는 스크립트에 if __name__ == "__main__": 가드가 있어야 한다.
+
+import os
+import json
+import time
+from functools import partial
+from multiprocessing import Pool
+from tqdm import tqdm
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_BOM = b"\xef\xbb\xbf"
+
+
+def parse_json_bytes(raw: bytes):
+    """UTF-8(BOM 허용) JSON 바이트 파싱 (orjson 우선)"""
+    if raw.startswith(_BOM):
+        raw = raw[len(_BOM):]
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def read_json_file(path):
+    with open(path, "rb") as f:
+        return parse_json_bytes(f.read())
+
+
+def return_data(path, data):
+    return data
+
+
+class LoadReport:
+    """로딩 결과 통계 (files / loaded / skipped / failed / files_per_s)"""
+    def __init__(self, total: int):
+        self.total = total
+        self.loaded = 0
+        self.skipped = 0
+        self.failures = []
+        self.seconds = 0.0
+
+    @property
+    def failed(self):
+        return len(self.failures)
+
+    @property
+    def files_per_s(self):
+        return self.total / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {"files": self.total, "loaded": self.loaded, "skipped": self.skipped, "failed": self.failed,
+                "seconds": round(self.seconds, 2), "files_per_s": round(self.files_per_s, 1)}
+
+    def print_summary(self, max_failures: int = 10):
+        print(f"로딩 완료 : {self.total}개 파일, {self.loaded}개 성공, {self.skipped}개 건너뜀, {self.failed}개 실패 "
+              f"({self.seconds:.1f}s, {self.files_per_s:.1f} files/s)")
+        for path, error in self.failures[:max_failures]:
+            print(f"[오류] {path} → {error}")
+        if self.failed > max_failures:
+            print(f"... 외 {self.failed - max_failures}개 실패")
+
+
+def _load_one(path, reader, extract):
+    """워커에서 실행 : (경로, 성공 여부, 결과 또는 오류 메시지)"""
+    try:
+        return path, True, extract(path, reader(path))
+    except Exception as e:
+        return path, False, f"{type(e).__name__}: {e}"
+
+
+def iter_json_files(paths, extract=return_data, reader=read_json_file, workers: int = None, ordered: bool = True,
+                    chunksize: int = 64, desc: str = "파일 로딩 중", report: LoadReport = None):
+    """
+    JSON 파일을 병렬로 읽어 extract(path, data)의 결과를 하나씩 돌려주는 제너레이터 (None 결과는 건너뜀)
+
+    Input:
+        paths (list): JSON 파일 경로 리스트
+        extract: (경로, 파싱된 데이터) → 결과 (모듈 최상위 함수 또는 functools.partial)
+        reader: 경로 → 파싱된 데이터 (인코딩 판별이 필요한 모듈은 자체 reader 전달)
+        workers (int): 프로세스 수 (None이면 CPU 수, 1 이하면 현재 프로세스에서 순차 처리)
+        ordered (bool): True면 입력 순서 유지
+        chunksize (int): 워커에 한 번에 넘길 파일 수
+        report (LoadReport): 통계를 채울 객체 (제너레이터가 끝나면 완성됨)
+    """
+    paths = list(paths)
+    report = report if report is not None else LoadReport(len(paths))
+    report.total = len(paths)
+    workers = os.cpu_count() if workers is None else workers
+    task = partial(_load_one, reader=reader, extract=extract)
+    start = time.perf_counter()
+
+    def consume(results):
+        for path, ok, result in tqdm(results, total=len(paths), desc=desc):
+            if not ok:
+                report.failures.append((str(path), result))
+            elif result is None:
+                report.skipped += 1
+            else:
+                report.loaded += 1
+                yield result
+
+    try:
+        if workers <= 1 or len(paths) < chunksize * 2:
+            yield from consume(map(task, paths))
+        else:
+            with Pool(workers) as pool:
+                mapper = pool.imap if ordered else pool.imap_unordered
+                yield from consume(mapper(task, paths, chunksize=chunksize))
+    finally:
+        report.seconds = time.perf_counter() - start
+
+
+def load_json_files(paths, extract=return_data, reader=read_json_file, workers: int = None, ordered: bool = True,
+                    chunksize: int = 64, desc: str = "파일 로딩 중", verbose: bool = True):
+    """
+    iter_json_files의 리스트 버전
+
+    Return:
+        (results, report) : extract 결과 리스트, LoadReport
+    """
+    paths = list(paths)
+    report = LoadReport(len(paths))
+    results = list(iter_json_files(paths, extract, reader, workers, ordered, chunksize, desc, report))
+    if verbose:
+        report.print_summary()
+    return results, report
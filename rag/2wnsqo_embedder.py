@@ -1,7 +1,14 @@
 import os
+import numpy as np
 import torch
-from sentence_transformers import SentenceTransformer
+from rag import model_registry
 import faiss
+from rag.chunk_store import write_chunk_store, chunk_store_path
+from rag.index_factory import build_index, write_index
+from rag.incremental_index import update_index
+from rag.embedding_cache import cached_encode, cached_encoder
+from rag.streaming_builder import build_streaming
+from rag.embedding_pool import EmbeddingPool
 
 def load_chunks(file_path: str) -> list:
     """텍스트 파일에서 줄 단위로 청크를 불러오기"""
@@ -11,38 +18,56 @@ def load_chunks(file_path: str) -> list:
     return chunks
 
 def get_embedding_model(model_name: str = "jhgan/ko-sroberta-multitask"):
-    """임베딩 모델 로드"""
+    """임베딩 모델 로드 (프로세스 공용 레지스트리)"""
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"🖥️ 사용하는 디바이스: {device}")
-    return SentenceTransformer(model_name, device=device)
+    return model_registry.get_embedding_model(model_name, device=device)
 
-def create_faiss_index(embeddings):
-    """FAISS 인덱스를 생성하고 벡터를 추가"""
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings)
+def create_faiss_index(embeddings, index_type: str = None, **params):
+    """L2 정규화한 벡터로 내적(=코사인) FAISS 인덱스를 생성하고 벡터를 추가 (index_type: flat | ivf_flat | hnsw | ivf_pq)"""
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    faiss.normalize_L2(embeddings)
+    index = build_index(embeddings, index_type, **params)
     print(f"✅ FAISS 인덱스에 {len(embeddings)}개의 벡터가 추가되었어.")
     return index
 
 def save_index_and_chunks(index, index_path: str, chunks: list, chunk_path: str):
     """FAISS 인덱스와 청크를 저장"""
-    faiss.write_index(index, index_path)
-    with open(chunk_path, "w", encoding="utf-8") as f:
-        for chunk in chunks:
-            f.write(chunk + "\n\n")
+    write_index(index, index_path)
+    store_path = write_chunk_store(chunks, chunk_store_path(chunk_path))
     print(f"💾 인덱스 저장: {index_path}")
-    print(f"💾 청크 저장: {chunk_path}")
+    print(f"💾 청크 저장: {store_path}")
 
-def embed_and_save_faiss(file_path: str, index_path: str, chunk_path: str):
-    """전체 프로세스 실행: 텍스트 → 임베딩 → FAISS 인덱스 생성 → 저장"""
+def embed_and_save_faiss(file_path: str, index_path: str, chunk_path: str, streaming: bool = False, index_type: str = None,
+                         workers: int = 0, threads_per_worker: int = None):
+    """
+    전체 프로세스 실행: 텍스트 → 임베딩 → FAISS 인덱스 생성 → 저장
+    streaming=True면 배치 단위로 읽고/임베딩/기록하며 체크포인트에서 재개 가능 (rag/streaming_builder.py)
+    workers > 1이면 CPU 워커 프로세스 풀로 나눠 임베딩 (rag/embedding_pool.py)
+    """
+    if workers > 1:
+        with EmbeddingPool("jhgan/ko-sroberta-multitask", workers, threads_per_worker) as pool:
+            return _embed_and_save(pool, file_path, index_path, chunk_path, streaming, index_type)
+    return _embed_and_save(get_embedding_model(), file_path, index_path, chunk_path, streaming, index_type)
+
+def _embed_and_save(model, file_path: str, index_path: str, chunk_path: str, streaming: bool, index_type: str):
+    if streaming:
+        build_streaming(file_path, index_path, chunk_path, model, index_type=index_type)
+        print("🎉 모든 작업이 완료되었어!")
+        return
     chunks = load_chunks(file_path)
-    model = get_embedding_model()
     print(f"🧠 임베딩 시작...")
-    embeddings = model.encode(chunks, batch_size=64, show_progress_bar=True)
-    index = create_faiss_index(embeddings)
+    embeddings = cached_encode(model, chunks, batch_size=64, show_progress_bar=True)
+    index = create_faiss_index(embeddings, index_type)
     save_index_and_chunks(index, index_path, chunks, chunk_path)
     print("🎉 모든 작업이 완료되었어!")
 
+def update_faiss(file_path: str, index_path: str, chunk_path: str):
+    """증분 업데이트: 새 청크만 임베딩해서 기존 인덱스/청크 저장소에 추가, 사라진 청크는 tombstone 처리"""
+    chunks = load_chunks(file_path)
+    model = get_embedding_model()
+    return update_index(chunks, index_path, chunk_path, cached_encoder(model))
+
 # 사용 예시
 if __name__ == "__main__":
     embed_and_save_faiss(
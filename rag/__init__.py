@@ -1,2 +1,10 @@
-from .hyeonseong_vector_store import Vector_store
-from .hyeonseong_embedder import Embedder
\ No newline at end of file
+# Vector_store / Embedder는 sentence_transformers, langchain_openai 등 무거운 모듈을 import하므로
+# rag.vector_store 같은 하위 모듈만 쓸 때는 로드하지 않도록 처음 접근할 때 import (PEP 562)
+def __getattr__(name):
+    if name == "Vector_store":
+        from .hyeonseong_vector_store import Vector_store
+        return Vector_store
+    if name == "Embedder":
+        from .hyeonseong_embedder import Embedder
+        return Embedder
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,41 +1,121 @@
-# llm/category_classifier.py
+# ✅ rag/category_classifier.py
+# 카테고리 벡터 DB의 라벨 임베딩으로 질문을 분류하는 로컬 분류기 (weighted kNN 투표)
+# 확신도가 임계값보다 낮을 때만 분류 LLM(llm/category_classifier.py)을 호출한다.
+# 오프라인 비교 리포트 : python -m rag.category_classifier --sample 200 --output knn_vs_llm.json
 
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+import json
+import argparse
+import numpy as np
+from llm.category_classifier import classify_category_with_llm
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def classify_category_with_llm(input_text, retrieved_examples):
-    fewshot = ""
-    for i, (ex, cat, score) in enumerate(retrieved_examples):
-        fewshot += f"예시 {i+1}:\n텍스트: \"{ex}\"\n카테고리: {cat}\n\n"
+class KNNCategoryClassifier:
+    """
+    정규화된 카테고리 임베딩에 대한 가중 kNN 분류기.
+    상위 k개 이웃이 softmax(유사도 / temperature) 가중치로 투표하고,
+    1등 라벨의 득표 비율을 확신도(0~1)로 돌려준다.
+    """
+    def __init__(self, embeddings_norm, categories, k: int = 10, temperature: float = 0.05):
+        self.embeddings_norm = embeddings_norm
+        if hasattr(categories, "codes") and hasattr(categories, "labels"):
+            # 버전 포맷 카테고리 DB의 CategoryLabels: 이미 정수 코드 + 라벨 표
+            self.labels, self.codes = np.asarray(categories.labels), np.asarray(categories.codes, dtype=np.int64)
+        else:
+            self.labels, self.codes = np.unique(np.asarray(categories), return_inverse=True)
+        self.k = k
+        self.temperature = temperature
 
-    prompt = f"""
-당신은 텍스트를 아래 6가지 카테고리 중 하나로만 분류해야 하는 전문가입니다.
+    def predict_from_sims(self, sims, exclude=None):
+        """
+        이미 계산한 코사인 유사도 (N,)로 분류
 
-선택 가능한 카테고리:
-- medicine
-- treatment
-- assist_answer
-- assist_question
-- internal_answer
-- internal_question
+        Input:
+            sims (np.ndarray): 질문과 카테고리 DB 전체의 유사도
+            exclude (int): 투표에서 뺄 항목 번호 (오프라인 평가의 leave-one-out용)
+        Return:
+            (라벨, 확신도)
+        """
+        if exclude is not None:
+            sims = sims.copy()
+            sims[exclude] = -np.inf
+        k = min(self.k, len(sims))
+        top = np.argpartition(sims, -k)[-k:]
+        top_sims = sims[top]
+        weights = np.exp((top_sims - top_sims.max()) / self.temperature)
+        scores = np.bincount(self.codes[top], weights=weights, minlength=len(self.labels))
+        best = int(np.argmax(scores))
+        return str(self.labels[best]), float(scores[best] / scores.sum())
 
-아래는 분류된 예시들입니다:
-{fewshot}
+    def predict(self, query_emb_norm):
+        return self.predict_from_sims(self.embeddings_norm @ query_emb_norm)
 
-이제 입력된 텍스트를 위 카테고리 중 **하나만** 선택하여 분류하세요.
-카테고리 이름만 출력하세요. 다른 설명 없이 정확히 하나의 카테고리명만 출력해야 합니다.
 
-입력 텍스트: "{input_text}"
+def classify_category(input_text, retrieved_examples, sims, classifier, threshold: float):
+    """
+    로컬 분류기 우선, 확신도 < threshold면 LLM 분류
 
-정답 카테고리:"""
+    Return:
+        (카테고리, 로컬 확신도, 사용한 분류기 "knn" | "llm")
+    """
+    label, confidence = classifier.predict_from_sims(sims)
+    if confidence >= threshold:
+        return label, confidence, "knn"
+    return classify_category_with_llm(input_text, retrieved_examples), confidence, "llm"
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
-    )
-    return response.choices[0].message.content.strip()
+
+def agreement_report(classifier, texts, sample_size: int = 200, threshold: float = 0.8, few_shot: int = 3, seed: int = 42):
+    """
+    카테고리 DB에서 표본을 뽑아 kNN(자기 자신 제외)과 LLM 분류 결과를 비교
+
+    Return:
+        dict: 일치율, 임계값 이상 구간의 일치율/비율, 정답 라벨 대비 정확도, 혼동 행렬
+    """
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(texts), size=min(sample_size, len(texts)), replace=False)
+    rows = []
+    for i in sample:
+        sims = classifier.embeddings_norm @ classifier.embeddings_norm[i]
+        knn_label, confidence = classifier.predict_from_sims(sims, exclude=i)
+        sims[i] = -np.inf
+        top = np.argsort(sims)[-few_shot:][::-1]
+        examples = [(texts[j], str(classifier.labels[classifier.codes[j]]), float(sims[j])) for j in top]
+        llm_label = classify_category_with_llm(texts[i], examples)
+        rows.append((str(classifier.labels[classifier.codes[i]]), knn_label, llm_label, confidence))
+
+    confident = [r for r in rows if r[3] >= threshold]
+    confusion = {}
+    for _, knn_label, llm_label, _ in rows:
+        confusion.setdefault(llm_label, {}).setdefault(knn_label, 0)
+        confusion[llm_label][knn_label] += 1
+    n = len(rows)
+    return {
+        "n": n,
+        "threshold": threshold,
+        "agreement": sum(r[1] == r[2] for r in rows) / n,
+        "confident_ratio": len(confident) / n,
+        "confident_agreement": sum(r[1] == r[2] for r in confident) / len(confident) if confident else None,
+        "knn_accuracy": sum(r[0] == r[1] for r in rows) / n,
+        "llm_accuracy": sum(r[0] == r[2] for r in rows) / n,
+        "confusion_llm_vs_knn": confusion,
+    }
+
+
+if __name__ == "__main__":
+    import config
+    from rag.vector_store import load_category_vector_db
+
+    parser = argparse.ArgumentParser(description="kNN 카테고리 분류기 vs LLM 분류 일치율 리포트")
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=config.LOCAL_CLASSIFIER_THRESHOLD)
+    parser.add_argument("--k", type=int, default=config.LOCAL_CLASSIFIER_K)
+    parser.add_argument("--output", default="knn_vs_llm_report.json")
+    args = parser.parse_args()
+
+    texts, categories, embeddings_norm = load_category_vector_db()
+    classifier = KNNCategoryClassifier(embeddings_norm, categories, k=args.k)
+
+    report = agreement_report(classifier, texts, sample_size=args.sample, threshold=args.threshold)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps({k: v for k, v in report.items() if k != "confusion_llm_vs_knn"}, ensure_ascii=False, indent=2))
+    print(f"리포트 저장 : {args.output}")
@@ -0,0 +1,217 @@
+# ✅ rag/chunk_store.py
+# 오프셋 인덱스 청크 저장소 : "\n\n"으로 이어 붙인 텍스트 파일 대신
+#   <이름>.chunks/data.bin     모든 청크의 UTF-8 바이트를 이어 붙인 blob
+#   <이름>.chunks/offsets.bin  int64 시작 오프셋 (청크 수 + 1개, 마지막 값 = blob 길이)
+#   <이름>.chunks/meta.json    형식/버전/청크 수
+# 읽을 때는 두 파일을 memory-map 하고 id로 필요한 청크만 디코딩한다.
+# 청크 안에 빈 줄이 있어도 FAISS 벡터 id와 어긋나지 않는다.
+#
+# 예전 텍스트 파일 변환 : python -m rag.chunk_store <청크.txt> [--index <인덱스 파일>]
+
+import os
+import mmap
+import json
+import logging
+import argparse
+import numpy as np
+
+FORMAT_NAME = "chunkstore"
+FORMAT_VERSION = 1
+_DATA = "data.bin"
+_OFFSETS = "offsets.bin"
+_META = "meta.json"
+
+logger = logging.getLogger("chatbot.chunk_store")
+
+
+def chunk_store_path(chunks_path: str) -> str:
+    """예전 청크 텍스트 파일 경로 → 청크 저장소 디렉토리 경로 (x_chunks1.txt → x_chunks1.chunks)"""
+    root, ext = os.path.splitext(chunks_path)
+    return (root if ext == ".txt" else chunks_path) + ".chunks"
+
+
+def is_chunk_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, _META))
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, _META), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_NAME or meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 청크 저장소 형식입니다: {path} ({meta.get('format')} v{meta.get('version')})")
+    return meta
+
+
+def _write_json_atomic(path: str, payload: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ChunkStore:
+    """
+    읽기 전용 청크 저장소. 리스트처럼 len(), store[i], 슬라이스, for 문을 지원한다.
+    memory-map 기반이라 여러 스레드/요청이 복사 없이 같이 읽어도 안전하다.
+    limit을 주면 앞의 limit개만 보인다 (인덱스에 아직 반영되지 않은 뒤쪽 청크 무시).
+    """
+    def __init__(self, path: str, limit: int = None):
+        self.path = path
+        meta = _read_meta(path)
+        self._count = int(meta["count"]) if limit is None else min(int(meta["count"]), limit)
+        self._offsets = np.memmap(os.path.join(path, _OFFSETS), dtype=np.int64, mode="r", shape=(self._count + 1,))
+        data_size = int(self._offsets[-1])
+        self._file = open(os.path.join(path, _DATA), "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if data_size else b""
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        i = int(i)
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(f"청크 id 범위 밖입니다: {i} (총 {self._count}개)")
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._data[start:end].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class ChunkStoreWriter:
+    """
+    청크를 순서대로 이어 쓰는 writer. close() 할 때 meta.json을 원자적으로 기록한다.
+    append=True면 기존 저장소 뒤에 이어 쓴다 (meta.json에 기록된 청크 수 이후의 잔여 바이트는 잘라냄).
+    truncate_to를 주면 그 개수까지만 남기고 이어 쓴다 (체크포인트에서 재개할 때).
+    """
+    def __init__(self, path: str, append: bool = False, truncate_to: int = None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        data_path, offsets_path = os.path.join(path, _DATA), os.path.join(path, _OFFSETS)
+
+        if append and is_chunk_store(path):
+            self.count = int(_read_meta(path)["count"])
+            if truncate_to is not None:
+                if truncate_to > self.count:
+                    raise ValueError(f"저장된 청크 수({self.count})보다 많이 남길 수 없습니다: {truncate_to}")
+                self.count = truncate_to
+            offsets = np.memmap(offsets_path, dtype=np.int64, mode="r", shape=(self.count + 1,))
+            self._position = int(offsets[-1])
+            del offsets
+            # 중단된 쓰기의 잔여분 제거
+            with open(data_path, "r+b") as f:
+                f.truncate(self._position)
+            with open(offsets_path, "r+b") as f:
+                f.truncate((self.count + 1) * 8)
+            self._data = open(data_path, "ab")
+            self._offsets = open(offsets_path, "ab")
+        else:
+            self.count = 0
+            self._position = 0
+            self._data = open(data_path, "wb")
+            self._offsets = open(offsets_path, "wb")
+            self._offsets.write(np.int64(0).tobytes())
+
+    def add(self, text: str) -> int:
+        """청크 하나 추가, 부여된 id 반환"""
+        encoded = text.encode("utf-8")
+        self._data.write(encoded)
+        self._position += len(encoded)
+        self._offsets.write(np.int64(self._position).tobytes())
+        self.count += 1
+        return self.count - 1
+
+    def add_many(self, texts):
+        for text in texts:
+            self.add(text)
+
+    def flush(self):
+        """지금까지 쓴 청크를 디스크에 확정 (meta.json 갱신)"""
+        for f in (self._data, self._offsets):
+            f.flush()
+            os.fsync(f.fileno())
+        _write_json_atomic(
+            os.path.join(self.path, _META),
+            {"format": FORMAT_NAME, "version": FORMAT_VERSION, "count": self.count, "data_bytes": self._position},
+        )
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        self._offsets.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_chunk_store(chunks, path: str) -> str:
+    """청크 리스트를 저장소로 저장하고 경로 반환"""
+    with ChunkStoreWriter(path) as writer:
+        writer.add_many(chunks)
+    return path
+
+
+def load_legacy_chunks(chunks_path: str) -> list:
+    """예전 "\n\n" 구분 텍스트 파일 읽기"""
+    with open(chunks_path, "r", encoding="utf-8") as f:
+        return [c.strip() for c in f.read().split("\n\n") if c.strip()]
+
+
+def open_chunks(chunks_path: str):
+    """
+    청크 열기. 저장소(<이름>.chunks 또는 경로 자체)가 있으면 ChunkStore, 없으면 예전 텍스트 파일을 리스트로 읽는다.
+    """
+    for candidate in (chunks_path, chunk_store_path(chunks_path)):
+        if is_chunk_store(candidate):
+            return ChunkStore(candidate)
+    logger.warning(
+        "청크 저장소가 없어 예전 텍스트 형식으로 읽습니다 (python -m rag.chunk_store <청크.txt> 로 변환 권장)",
+        extra={"chunks_path": chunks_path},
+    )
+    return load_legacy_chunks(chunks_path)
+
+
+def validate_chunk_count(chunks, index, chunks_path: str = ""):
+    """청크 수와 FAISS 인덱스 벡터 수가 다르면 ValueError (id 어긋남 방지)"""
+    if len(chunks) != index.ntotal:
+        raise ValueError(
+            f"청크 수({len(chunks)})와 인덱스 벡터 수({index.ntotal})가 다릅니다: {chunks_path}"
+        )
+
+
+def convert_legacy_chunks(chunks_path: str, store_path: str = None, index_path: str = None) -> str:
+    """
+    예전 텍스트 청크 파일 → 청크 저장소 변환. index_path를 주면 청크 수를 인덱스와 대조한다.
+    """
+    store_path = store_path or chunk_store_path(chunks_path)
+    chunks = load_legacy_chunks(chunks_path)
+    if index_path:
+        import faiss
+        validate_chunk_count(chunks, faiss.read_index(index_path), chunks_path)
+    write_chunk_store(chunks, store_path)
+    print(f"청크 저장소 변환 : {chunks_path} → {store_path} ({len(chunks)}개)")
+    return store_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="\\n\\n 구분 청크 텍스트 파일을 오프셋 인덱스 청크 저장소로 변환")
+    parser.add_argument("chunks_path")
+    parser.add_argument("--index", default=None, help="청크 수를 대조할 FAISS 인덱스 파일")
+    parser.add_argument("--output", default=None, help="저장소 경로 (기본: <이름>.chunks)")
+    args = parser.parse_args()
+    convert_legacy_chunks(args.chunks_path, args.output, args.index)
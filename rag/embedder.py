@@ -1,4 +1,5 @@
-from sentence_transformers import SentenceTransformer
+from rag.model_registry import get_embedding_model, KO_SROBERTA
 
 def load_embedder():
-    return SentenceTransformer("jhgan/ko-sroberta-multitask")
\ No newline at end of file
+    # 프로세스 공용 레지스트리의 ko-sroberta (모듈마다 따로 로드하지 않음)
+    return get_embedding_model(KO_SROBERTA)
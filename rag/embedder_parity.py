@@ -0,0 +1,78 @@
+# 임베딩 백엔드 parity / 처리량 비교 (fp32 기준)
+# - QA 청크 표본을 fp32와 각 백엔드(int8, onnx 등)로 임베딩해서 코사인 드리프트 측정
+# - fp32 기준 top-k 이웃과 백엔드 top-k 이웃의 겹침(recall@k)으로 검색 품질 변화 확인
+# - 백엔드별 docs/s 처리량 비교
+#
+# 사용법 : python -m rag.embedder_parity --chunks vector_db/QA_random_pair_part1_chunks1.txt --sample 2000 --backends int8,onnx
+
+import time
+import json
+import argparse
+import numpy as np
+from rag.model_registry import get_embedding_model, KO_SROBERTA
+from rag.chunk_store import open_chunks
+
+
+def load_sample_chunks(chunks_path: str, sample: int, seed: int = 0) -> list:
+    """청크 파일에서 표본 추출"""
+    chunks = open_chunks(chunks_path)
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(chunks), size=min(sample, len(chunks)), replace=False)
+    return [chunks[i] for i in sorted(idx)]
+
+
+def encode_timed(model, texts: list, batch_size: int):
+    start = time.perf_counter()
+    embs = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    elapsed = time.perf_counter() - start
+    return np.asarray(embs, dtype="float32"), len(texts) / elapsed
+
+
+def topk_overlap(reference: np.ndarray, candidate: np.ndarray, k: int = 10, queries: int = 200) -> float:
+    """앞쪽 queries개 청크를 질의로 써서 fp32 top-k와 백엔드 top-k가 겹치는 비율"""
+    q = min(queries, len(reference))
+    ref_top = np.argsort(-(reference[:q] @ reference.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(candidate[:q] @ candidate.T), axis=1)[:, :k]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]))
+
+
+def parity_report(texts: list, backends: list, model_name: str = KO_SROBERTA, batch_size: int = 64, k: int = 10) -> dict:
+    base_model = get_embedding_model(model_name, device="cpu", precision="fp32")
+    base, base_dps = encode_timed(base_model, texts, batch_size)
+    report = {"model": model_name, "n": len(texts), "fp32": {"docs_per_sec": base_dps}}
+
+    for backend in backends:
+        try:
+            model = get_embedding_model(model_name, device="cpu", precision=backend)
+        except Exception as e:
+            report[backend] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        embs, dps = encode_timed(model, texts, batch_size)
+        cosine = np.sum(base * embs, axis=1)  # 둘 다 정규화됨
+        report[backend] = {
+            "docs_per_sec": dps,
+            "speedup": dps / base_dps,
+            "cosine_mean": float(cosine.mean()),
+            "cosine_min": float(cosine.min()),
+            "cosine_p01": float(np.percentile(cosine, 1)),
+            f"recall@{k}": topk_overlap(base, embs, k=k),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 백엔드 parity / 처리량 비교")
+    parser.add_argument("--chunks", required=True, help="표본을 뽑을 청크 파일 (\\n\\n 구분)")
+    parser.add_argument("--sample", type=int, default=2000)
+    parser.add_argument("--backends", default="int8,onnx")
+    parser.add_argument("--model", default=KO_SROBERTA)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", default="embedder_parity_report.json")
+    args = parser.parse_args()
+
+    texts = load_sample_chunks(args.chunks, args.sample)
+    report = parity_report(texts, [b for b in args.backends.split(",") if b], args.model, args.batch_size)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"리포트 저장 : {args.output}")
@@ -0,0 +1,185 @@
+# ✅ rag/embedding_cache.py
+# 인덱스 재빌드용 디스크 임베딩 캐시
+# (모델 이름, 모델 revision, 정밀도, 정규화 여부)마다 디렉토리 하나 :
+#   keys.bin     청크 텍스트 sha1 다이제스트 (20바이트씩)
+#   vectors.bin  float32 임베딩 (count × dim), memory-map으로 읽음
+#   meta.json    모델/revision/차원/개수 (마지막에 원자적으로 기록 → 중단된 추가분은 다음에 잘라냄)
+# 텍스트가 같으면 인덱스 종류, 청킹 조합, 원본 파일 병합을 바꿔도 모델을 다시 돌리지 않는다.
+# 캐시 위치는 환경변수 EMBEDDING_DISK_CACHE_DIR (기본 <프로젝트 루트>/.embedding_cache, 상대 경로도 프로젝트 루트 기준,
+# 빈 문자열이면 캐시 끔). 실행 디렉토리와 상관없이 같은 캐시를 쓴다. 한 번에 한 빌드 프로세스만 쓴다고 가정.
+
+import os
+import json
+import hashlib
+import numpy as np
+
+# 프로젝트 루트 (config.BASE_DIR과 같은 위치, config는 OPENAI_API_KEY가 필요해 빌드 스크립트에서 import하지 않음)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _resolve_cache_dir(path: str) -> str:
+    """빈 문자열(캐시 끔)은 그대로, 상대 경로는 프로젝트 루트 기준 절대 경로로"""
+    if not path:
+        return path
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+DEFAULT_CACHE_DIR = _resolve_cache_dir(os.getenv("EMBEDDING_DISK_CACHE_DIR", ".embedding_cache"))
+_KEY_BYTES = 20
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def model_revision(model) -> str:
+    """SentenceTransformer가 허브에서 받은 모델의 commit hash (로컬 경로 모델 등은 "unknown")"""
+    if isinstance(getattr(model, "revision", None), str):  # EmbeddingPool 등 revision을 직접 가진 경우
+        return model.revision
+    try:
+        return model._first_module().auto_model.config._commit_hash or "unknown"
+    except AttributeError:
+        return "unknown"
+
+
+class DiskEmbeddingCache:
+    """
+    텍스트 다이제스트 → 임베딩 행 캐시. get_many()로 조회하고 put_many()로 뒤에 추가한다.
+    """
+    def __init__(self, cache_dir: str, model_name: str, revision: str, precision: str = "fp32", normalized: bool = False):
+        self.namespace = {"model": model_name, "revision": revision, "precision": precision, "normalized": normalized}
+        key = hashlib.sha1(json.dumps(self.namespace, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, key)
+        os.makedirs(self.path, exist_ok=True)
+        self._keys_path = os.path.join(self.path, "keys.bin")
+        self._vectors_path = os.path.join(self.path, "vectors.bin")
+        self._meta_path = os.path.join(self.path, "meta.json")
+
+        self.dim, self.count = None, 0
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.count = meta["dim"], meta["count"]
+        self._rows = {}
+        if self.count:
+            keys = np.fromfile(self._keys_path, dtype=f"V{_KEY_BYTES}", count=self.count)
+            self._rows = {bytes(k): i for i, k in enumerate(keys)}
+        self._vectors = None
+        self.hits = 0
+        self.misses = 0
+
+    def _vector_map(self):
+        if self._vectors is None and self.count:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        return self._vectors
+
+    def get_many(self, digests):
+        """
+        Return:
+            (rows, missing) : 찾은 항목 {순번: 벡터}, 못 찾은 순번 리스트
+        """
+        found, missing = {}, []
+        for i, digest in enumerate(digests):
+            row = self._rows.get(digest)
+            if row is None:
+                missing.append(i)
+            else:
+                found[i] = row
+        self.hits += len(found)
+        self.misses += len(missing)
+        rows = {}
+        if found:
+            order = sorted(found, key=found.get)  # 파일 순서대로 읽기
+            vectors = self._vector_map()[[found[i] for i in order]]
+            rows = dict(zip(order, vectors))
+        return rows, missing
+
+    def put_many(self, digests, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"캐시 차원({self.dim})과 임베딩 차원({vectors.shape[1]})이 다릅니다")
+
+        new, seen = [], set()
+        for digest, vector in zip(digests, vectors):
+            if digest not in self._rows and digest not in seen:
+                seen.add(digest)
+                new.append((digest, vector))
+        if not new:
+            return
+        for path, size in ((self._keys_path, _KEY_BYTES), (self._vectors_path, self.dim * 4)):
+            # meta.json에 기록되지 않은 (중단된) 꼬리 제거 후 추가
+            with open(path, "ab") as f:
+                f.truncate(self.count * size)
+        with open(self._keys_path, "ab") as kf, open(self._vectors_path, "ab") as vf:
+            for digest, vector in new:
+                kf.write(digest)
+                vf.write(vector.tobytes())
+            for f in (kf, vf):
+                f.flush()
+                os.fsync(f.fileno())
+        for offset, (digest, _) in enumerate(new):
+            self._rows[digest] = self.count + offset
+        self.count += len(new)
+        self._vectors = None
+
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({**self.namespace, "dim": self.dim, "count": self.count}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._meta_path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": self.count, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+_caches = {}
+
+
+def get_disk_cache(model, normalized: bool = False, cache_dir: str = None):
+    """공유 모델 핸들(SharedEmbeddingModel)에 맞는 캐시 (캐시를 끈 경우 None)"""
+    cache_dir = DEFAULT_CACHE_DIR if cache_dir is None else cache_dir
+    if not cache_dir:
+        return None
+    model_name = getattr(model, "model_name", None) or type(model).__name__
+    precision = getattr(model, "precision", "fp32")
+    key = (os.path.realpath(cache_dir), model_name, precision, normalized)
+    if key not in _caches:
+        revision = model_revision(model)
+        if revision == "unknown":
+            print(f"[경고] {model_name}의 revision을 알 수 없습니다. 모델 파일을 바꿨다면 캐시 디렉토리를 비우세요.")
+        _caches[key] = DiskEmbeddingCache(cache_dir, model_name, revision, precision, normalized)
+    return _caches[key]
+
+
+def cached_encode(model, texts, batch_size: int = 64, cache_dir: str = None, **encode_kwargs) -> np.ndarray:
+    """
+    model.encode와 같은 결과 (N, D) float32. 캐시에 있는 텍스트는 건너뛰고 없는 것만 모델로 임베딩한다.
+    """
+    texts = list(texts)
+    cache = get_disk_cache(model, bool(encode_kwargs.get("normalize_embeddings")), cache_dir)
+    if cache is None:
+        return np.asarray(model.encode(texts, batch_size=batch_size, **encode_kwargs), dtype=np.float32)
+
+    digests = [text_digest(text) for text in texts]
+    rows, missing = cache.get_many(digests)
+    if missing:
+        encoded = np.asarray(
+            model.encode([texts[i] for i in missing], batch_size=batch_size, **encode_kwargs), dtype=np.float32
+        )
+        cache.put_many([digests[i] for i in missing], encoded)
+        rows.update(zip(missing, encoded))
+    if len(texts) > 1:
+        print(f"임베딩 캐시 : {len(texts) - len(missing)}개 재사용, {len(missing)}개 새로 임베딩")
+    if not texts:
+        return np.empty((0, cache.dim or 0), dtype=np.float32)
+    return np.stack([rows[i] for i in range(len(texts))]).astype(np.float32, copy=False)
+
+
+def cached_encoder(model, cache_dir: str = None):
+    """encode(texts, batch_size=..., **kwargs) 시그니처의 캐시 래퍼 (incremental_index.update_index 등에 전달)"""
+    def encode(texts, batch_size: int = 64, **encode_kwargs):
+        return cached_encode(model, texts, batch_size=batch_size, cache_dir=cache_dir, **encode_kwargs)
+    return encode
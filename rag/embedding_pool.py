@@ -0,0 +1,126 @@
+# ✅ rag/embedding_pool.py
+# CPU 인덱스 빌드용 멀티 프로세스 임베딩 풀
+# ko-sroberta처럼 작은 모델은 PyTorch intra-op 스레드만으로는 코어를 다 못 쓰므로
+# 워커 프로세스 N개 × 워커당 스레드 T개로 나눠 임베딩하고, 결과는 청크 순서대로 다시 합친다.
+# model.encode와 같은 시그니처라 빌더(embed_and_save_faiss, Embedder.build, build_streaming)에 모델 대신 넘길 수 있다.
+#
+# 최적 분할 찾기 : python -m rag.embedding_pool --chunks vector_db/QA_random_pair_part1_chunks1.txt --splits 1x32,4x8,8x4,16x2
+
+import os
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from rag.model_registry import KO_SROBERTA, DEFAULT_PRECISION
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, precision: str, threads: int):
+    # 스레드 수는 torch import 전에 환경변수로도 고정 (MKL/OpenMP 풀)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    global _worker_model
+    from rag.model_registry import get_embedding_model
+    _worker_model = get_embedding_model(model_name, device="cpu", precision=precision)
+
+
+def _encode_shard(texts, batch_size: int, encode_kwargs: dict):
+    return np.asarray(_worker_model.encode(texts, batch_size=batch_size, show_progress_bar=False, **encode_kwargs),
+                      dtype=np.float32)
+
+
+def _worker_revision():
+    from rag.embedding_cache import model_revision
+    return model_revision(_worker_model)
+
+
+class EmbeddingPool:
+    """
+    워커 프로세스마다 모델을 하나씩 올려 두고 청크를 shard_size개씩 나눠 임베딩.
+    precision을 주지 않으면 단일 프로세스 빌드와 같은 EMBEDDER_PRECISION을 쓴다 (워커 수에 따라 임베딩이 달라지지 않도록).
+    with 문으로 쓰거나 끝나면 close() 호출.
+    """
+    def __init__(self, model_name: str = KO_SROBERTA, workers: int = None, threads_per_worker: int = None,
+                 precision: str = None, shard_size: int = 256):
+        precision = precision or DEFAULT_PRECISION
+        cpus = os.cpu_count() or 1
+        self.workers = workers or max(1, cpus // (threads_per_worker or 4))
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.workers)
+        self.model_name = model_name
+        self.precision = precision
+        self.shard_size = shard_size
+        # fork는 부모의 torch 스레드 풀 상태를 물려받아 멈출 수 있으므로 spawn 사용
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, precision, self.threads_per_worker),
+        )
+        # 디스크 임베딩 캐시 키에 쓰는 모델 revision (워커 하나에서 확인, 모델 로드 대기 겸용)
+        self.revision = self._executor.submit(_worker_revision).result()
+        print(f"임베딩 풀 : 워커 {self.workers}개 × 스레드 {self.threads_per_worker}개 ({model_name}, {precision})")
+
+    def encode(self, sentences, batch_size: int = 64, show_progress_bar: bool = False, **encode_kwargs):
+        """model.encode와 같은 결과 (N, D) float32, 입력 순서 유지"""
+        texts = list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        shards = [texts[i:i + self.shard_size] for i in range(0, len(texts), self.shard_size)]
+        start = time.perf_counter()
+        # executor.map은 제출 순서대로 결과를 돌려준다
+        results = list(self._executor.map(
+            _encode_shard, shards, [batch_size] * len(shards), [encode_kwargs] * len(shards)
+        ))
+        elapsed = time.perf_counter() - start
+        if show_progress_bar or len(texts) >= self.shard_size * self.workers:
+            print(f"임베딩 {len(texts)}개 : {elapsed:.1f}s ({len(texts) / elapsed:.1f} docs/s)")
+        return np.concatenate(results)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def benchmark_splits(texts, splits, model_name: str = KO_SROBERTA, precision: str = None, batch_size: int = 64) -> list:
+    """워커 × 스레드 조합별 docs/s (모델 로드 시간 제외)"""
+    rows = []
+    for workers, threads in splits:
+        with EmbeddingPool(model_name, workers, threads, precision) as pool:
+            pool.encode(texts[: pool.shard_size * workers], batch_size=batch_size)  # 워밍업
+            start = time.perf_counter()
+            pool.encode(texts, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+        rows.append({"workers": workers, "threads": threads, "docs_per_s": len(texts) / elapsed})
+        print(f"{workers:>3} 워커 × {threads:>2} 스레드 : {len(texts) / elapsed:8.1f} docs/s")
+    return rows
+
+
+if __name__ == "__main__":
+    from rag.chunk_store import open_chunks
+
+    parser = argparse.ArgumentParser(description="워커 × 스레드 분할별 임베딩 처리량(docs/s) 비교")
+    parser.add_argument("--chunks", required=True, help="청크 파일 (.txt 또는 청크 저장소)")
+    parser.add_argument("--sample", type=int, default=4000)
+    parser.add_argument("--splits", default="1x{cpus},4x{q},{q}x4".replace("{cpus}", str(os.cpu_count() or 1))
+                        .replace("{q}", str(max(1, (os.cpu_count() or 4) // 4))),
+                        help="워커x스레드 목록 (예: 1x32,4x8,8x4)")
+    parser.add_argument("--model", default=KO_SROBERTA)
+    parser.add_argument("--precision", default=DEFAULT_PRECISION)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    chunks = open_chunks(args.chunks)
+    texts = [chunks[i] for i in range(min(args.sample, len(chunks)))]
+    splits = [tuple(int(x) for x in split.split("x")) for split in args.splits.split(",")]
+    benchmark_splits(texts, splits, args.model, args.precision, args.batch_size)
@@ -3,11 +3,18 @@
 # 최초 작성일 : 2025-06-02
 # 최초 작성자 : 손현성
 
-from sentence_transformers import SentenceTransformer
+from rag.model_registry import get_embedding_model
 from preprocessing.hyeonseong_preprocess_jsonl import DataDownLoad
 import os
+import numpy as np
 import torch
 import faiss
+from rag.chunk_store import write_chunk_store, chunk_store_path
+from rag.index_factory import build_index, write_index, evaluate_configs
+from rag.incremental_index import update_index, compact
+from rag.embedding_cache import cached_encode, cached_encoder
+from rag.streaming_builder import build_streaming
+from rag.embedding_pool import EmbeddingPool
 import gdown
 
 vectordb_path = {
@@ -49,45 +56,137 @@ class Embedder:
     
     def get_embedding_model(self):
         """
-        임베딩 모델 로드
+        임베딩 모델 로드 (프로세스 공용 레지스트리)
 
         Return:
-            SentenceTransformer: 임베딩 모델 객체
+            SharedEmbeddingModel: 공유 임베딩 모델 객체
         """
         device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"사용하는 디바이스 : {device}")
-        return SentenceTransformer(self.model_name, device=device)
+        return get_embedding_model(self.model_name, device=device)
     
-    def create_faiss_index(self, embeddings):
+    def create_faiss_index(self, embeddings, index_type: str = None, **params):
         """
-        FAISS 인덱스를 생성하고 벡터를 추가
+        L2 정규화한 벡터로 내적(=코사인) FAISS 인덱스를 생성하고 벡터를 추가
 
         Input:
             embeddings (np.ndarray): 임베딩 벡터 배열
+            index_type (str): flat | ivf_flat | hnsw | ivf_pq (None이면 환경변수 FAISS_INDEX_TYPE, 기본 flat)
+            params: nlist, nprobe, ef_search, pq_m 등 rag/index_factory.py의 파라미터
 
         Return:
-            faiss.IndexFlatL2: 생성된 FAISS 인덱스 객체
+            faiss.Index: 생성된 FAISS 인덱스 객체
         """
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(embeddings)
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        faiss.normalize_L2(embeddings)
+        index = build_index(embeddings, index_type, **params)
         print(f"FAISS 인덱스에 {len(embeddings)}개의 벡터가 추가되었습니다.")
         return index
     
     def save_index_and_chunks(self, index, chunks):
         """
-        FAISS 인덱스와 청크를 파일로 저장
+        FAISS 인덱스와 청크(오프셋 인덱스 청크 저장소)를 파일로 저장
 
         Input:
-            index (faiss.IndexFlatL2): 저장할 FAISS 인덱스 객체
+            index (faiss.Index): 저장할 FAISS 인덱스 객체 (검색 파라미터는 <인덱스>.params.json)
             chunks (list): 텍스트 청크 리스트
         """
-        faiss.write_index(index, self.index_path)
-        with open(self.chunk_path, "w", encoding="utf-8") as f:
-            for chunk in chunks:
-                f.write(chunk + "\n\n")
+        write_index(index, self.index_path)
+        store_path = write_chunk_store(chunks, chunk_store_path(self.chunk_path))
         print(f"인덱스 저장 : {self.index_path}")
-        print(f"청크 저장 : {self.chunk_path}")
+        print(f"청크 저장 : {store_path}")
+
+    def build(self, index_type: str = None, streaming: bool = False, workers: int = 0, threads_per_worker: int = None,
+              **params):
+        """
+        전체 프로세스 실행: 텍스트 → 임베딩 → FAISS 인덱스 생성 → 저장
+        medicine 코퍼스 압축 예시 : build("opq_ivf_pq", pq_m=48, rerank_k_factor=4)
+        (768차원 float32 3KB → 벡터당 약 48바이트 + 재정렬용 원본은 <인덱스>.vectors.npy memory-map)
+
+        Input:
+            index_type (str): flat | ivf_flat | hnsw | pq | ivf_pq | opq_ivf_pq
+            streaming (bool): True면 전체 코퍼스를 메모리에 올리지 않고 배치 단위로 빌드, 중단 시 재개 가능
+            workers (int): 1보다 크면 CPU 워커 프로세스 풀로 나눠 임베딩 (rag/embedding_pool.py)
+            threads_per_worker (int): 워커당 torch 스레드 수 (None이면 코어 수 / 워커 수)
+            params: rag/index_factory.py의 파라미터 (nprobe, pq_m, rerank_k_factor 등)
+
+        Return:
+            np.ndarray: 정규화된 임베딩 (compression_report에 재사용, streaming이면 None)
+        """
+        if workers > 1:
+            with EmbeddingPool(self.model_name, workers, threads_per_worker) as pool:
+                return self._build(pool, index_type, streaming, **params)
+        return self._build(self.get_embedding_model(), index_type, streaming, **params)
+
+    def _build(self, model, index_type: str, streaming: bool, **params):
+        if streaming:
+            build_streaming(self.file_path, self.index_path, self.chunk_path, model, index_type=index_type, **params)
+            print("모든 작업이 완료되었습니다.")
+            return None
+        chunks = self.load_chunks()
+        print("임베딩 시작......")
+        # 디스크 임베딩 캐시에 있는 청크는 모델을 다시 돌리지 않음 (rag/embedding_cache.py)
+        embeddings = cached_encode(model, chunks, batch_size=64, show_progress_bar=True)
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        faiss.normalize_L2(embeddings)
+        index = self.create_faiss_index(embeddings, index_type, **params)
+        self.save_index_and_chunks(index, chunks)
+        print("모든 작업이 완료되었습니다.")
+        return embeddings
+
+    def update(self):
+        """
+        증분 업데이트: 원본 파일에서 새로 생긴 청크만 임베딩해서 기존 인덱스/청크 저장소에 추가하고,
+        사라진 청크는 tombstone 처리 (rag/incremental_index.py)
+
+        Return:
+            dict: 추가/삭제/유지 개수 리포트
+        """
+        chunks = self.load_chunks()
+        model = self.get_embedding_model()
+        return update_index(chunks, self.index_path, self.chunk_path, cached_encoder(model))
+
+    def compact(self):
+        """
+        tombstone된 청크를 실제로 지우고 인덱스/청크 저장소를 다시 씀 (PQ 계열은 다시 임베딩)
+        """
+        encode_fn = None
+        if not isinstance(faiss.downcast_index(faiss.read_index(self.index_path)), (faiss.IndexFlat, faiss.IndexHNSWFlat, faiss.IndexIVFFlat)):
+            encode_fn = cached_encoder(self.get_embedding_model())
+        return compact(self.index_path, self.chunk_path, encode_fn=encode_fn)
+
+    def compression_report(self, embeddings, configs=None, queries: int = 500, k: int = 10, seed: int = 0):
+        """
+        압축 인덱스 설정별 벡터당 메모리, 비압축(Flat) 대비 recall@k, 질의 지연시간 비교
+
+        Input:
+            embeddings (np.ndarray): build()가 돌려준 정규화 임베딩
+            configs (list): index_factory.evaluate_configs 설정 리스트 (None이면 PQ/OPQ ± 재정렬)
+
+        Return:
+            list: 설정별 결과 dict
+        """
+        if configs is None:
+            configs = [
+                {"index_type": "flat"},
+                {"index_type": "ivf_pq", "pq_m": 48},
+                {"index_type": "opq_ivf_pq", "pq_m": 48},
+                {"index_type": "opq_ivf_pq", "pq_m": 48, "rerank_k_factor": 4},
+                {"index_type": "opq_ivf_pq", "pq_m": 96, "rerank_k_factor": 4},
+            ]
+        rng = np.random.default_rng(seed)
+        sample = embeddings[rng.choice(len(embeddings), size=min(queries, len(embeddings)), replace=False)]
+        sample = np.ascontiguousarray(sample + rng.normal(scale=0.05, size=sample.shape), dtype="float32")
+        faiss.normalize_L2(sample)
+
+        rows = evaluate_configs(embeddings, sample, configs, k=k)
+        for row in rows:
+            print(
+                f"{row['index_type']:<12} pq_m={row.get('pq_m', '-'):<4} rerank={row.get('rerank_k_factor', 0):<2} "
+                f"{row['bytes_per_vector']:>7.0f} B/vec ({row['compression']:.1f}x)  "
+                f"recall@{k}={row[f'recall@{k}']:.4f}  p50={row['p50_ms']:.3f}ms  p95={row['p95_ms']:.3f}ms"
+            )
+        return rows
 
     def vectordb_download(self, vectordb_path:str=vectordb_path):
         """
@@ -6,7 +6,9 @@ import os
 import faiss
 import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from rag.model_registry import get_embedding_model
+from rag.chunk_store import open_chunks
+from rag.index_factory import read_index
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
@@ -45,20 +47,19 @@ class Vector_store:
 
     def load_chunks(self, chunk_path: str):
         """
-        텍스트 청크 파일을 불러와 리스트로 반환
+        청크 저장소(<이름>.chunks)를 memory-map으로 열고, 없으면 예전 텍스트 청크 파일을 리스트로 읽기
 
         Input:
-            chunk_path (str): 청크 텍스트 파일 경로
+            chunk_path (str): 청크 텍스트 파일 또는 청크 저장소 경로
 
         Return:
-            list: 청크 문자열 리스트
+            ChunkStore | list: id로 접근 가능한 청크 시퀀스
         """
-        with open(chunk_path, "r", encoding="utf-8") as f:
-            return [c.strip() for c in f.read().split("\n\n") if c.strip()]
+        return open_chunks(chunk_path)
 
     def load_faiss_index(self, index_path: str):
         """
-        저장된 FAISS 인덱스를 불러옴
+        저장된 FAISS 인덱스를 불러옴 (params.json의 nprobe / efSearch 적용)
 
         Input:
             index_path (str): FAISS 인덱스 파일 경로
@@ -66,19 +67,19 @@ class Vector_store:
         Return:
             faiss.Index: 불러온 인덱스 객체
         """
-        return faiss.read_index(index_path)
+        return read_index(index_path)
 
     def load_embedding_model(self, model_name: str):
         """
-        임베딩 모델 로드
+        임베딩 모델 로드 (프로세스 공용 레지스트리)
 
         Input:
             model_name (str): SentenceTransformer 모델 이름
 
         Return:
-            SentenceTransformer: 임베딩 모델 객체
+            SharedEmbeddingModel: 공유 임베딩 모델 객체
         """
-        return SentenceTransformer(model_name)
+        return get_embedding_model(model_name)
 
     def connect_gpt(self, api_key: str, model_name: str):
         """
@@ -123,6 +124,6 @@ class Vector_store:
         """
         embedding = self.embedding_model.encode([question])
         _, indices = self.index.search(np.array(embedding).astype("float32"), top_k)
-        top_chunks = [self.chunks[i] for i in indices[0]]
+        top_chunks = [self.chunks[i] for i in indices[0] if i >= 0]  # 결과가 top_k보다 적으면 -1 (IVF/HNSW, tombstone)
         context = "\n".join(top_chunks)
         return self.rag_chain.invoke({"context": context, "question": question})
\ No newline at end of file
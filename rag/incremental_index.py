@@ -0,0 +1,338 @@
+# ✅ rag/incremental_index.py
+# FAISS 인덱스 + 청크 저장소 증분 업데이트
+# - 청크마다 내용 해시(sha1)를 계산해서 manifest(<인덱스>.manifest.json : 해시 → 벡터 id)에 기록
+# - 새 청크만 임베딩해서 기존 인덱스와 청크 저장소 뒤에 추가
+# - 원본에서 사라진 청크는 tombstone(<인덱스>.tombstones.npy)으로 표시 → 검색에서 제외, compact()로 정리
+# - 인덱스 / manifest / tombstone은 임시 파일에 쓴 뒤 os.replace로 교체
+# - manifest가 커밋 지점 : 청크 저장소 추가 → 인덱스 교체 → manifest 교체 순서라 중간에 멈춰도 repair()로 복구
+#   (update_index / compact 시작할 때 자동 호출)
+# - compact는 새 저장소/인덱스/manifest를 .compact로 만든 뒤 저널(<인덱스>.compact.json)을 남기고 교체
+#   → 저널이 있으면 끝까지 교체(roll forward), 없으면 .compact 파일을 버림
+#
+# 사용 예시 : update_index(chunks, index_path, chunk_path, model.encode)
+#            compact(index_path, chunk_path)   # 삭제 비율이 COMPACT_RATIO를 넘으면 권장
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import faiss
+from rag.chunk_store import ChunkStore, ChunkStoreWriter, chunk_store_path, is_chunk_store, load_legacy_chunks
+from rag.index_factory import params_path, tombstones_path
+
+MANIFEST_VERSION = 1
+COMPACT_RATIO = 0.05
+
+
+def manifest_path(index_path: str) -> str:
+    return index_path + ".manifest.json"
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+
+def _replace_atomic(path: str, write_fn):
+    """path.tmp에 쓰고 fsync 후 os.replace"""
+    tmp_path = path + ".tmp"
+    write_fn(tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _write_json(path: str, payload: dict):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+    _replace_atomic(path, write)
+
+
+def _write_tombstones(index_path: str, tombstones):
+    path = tombstones_path(index_path)
+    if not tombstones:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    # np.save는 확장자가 .npy가 아니면 붙이므로 파일 객체로 저장
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(sorted(tombstones), dtype="int64"))
+    _replace_atomic(path, write)
+
+
+def compact_journal_path(index_path: str) -> str:
+    return index_path + ".compact.json"
+
+
+def _remove_path(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _finish_compaction(index_path: str, chunk_path: str) -> bool:
+    """
+    compact의 교체 단계 (여러 번 실행해도 같은 결과).
+    저널이 있으면 .compact 결과로 교체를 마치고 True, 없으면 커밋 전에 멈춘 결과를 버리고 False.
+    """
+    journal = compact_journal_path(index_path)
+    store_path = chunk_store_path(chunk_path)
+    new_store, new_index, new_manifest = store_path + ".compact", index_path + ".compact", manifest_path(index_path) + ".compact"
+    if not os.path.exists(journal):
+        for path in (new_store, new_index, new_manifest):
+            _remove_path(path)
+        return False
+
+    # 디렉토리는 os.replace로 덮어쓸 수 없으므로 백업 이름으로 옮긴 뒤 교체
+    backup_store = store_path + ".old"
+    if os.path.exists(new_store):
+        if os.path.exists(store_path):
+            _remove_path(backup_store)
+            os.replace(store_path, backup_store)
+        os.replace(new_store, store_path)
+    if os.path.exists(new_index):
+        os.replace(new_index, index_path)
+    if os.path.exists(new_manifest):
+        os.replace(new_manifest, manifest_path(index_path))
+    _write_tombstones(index_path, [])
+    _remove_path(backup_store)
+    os.remove(journal)
+    return True
+
+
+def repair(index_path: str, chunk_path: str) -> dict:
+    """
+    중단된 update_index / compact 복구 : 인덱스 벡터 수를 기준으로 청크 저장소와 manifest를 맞춘다.
+    - 저널이 남은 compact → 교체 마저 진행
+    - 인덱스에 반영되지 않은 청크(저장소가 더 김) → manifest가 있을 때만 저장소를 인덱스 벡터 수로 잘라냄
+      (manifest가 없으면 중단된 추가분인지 다른 저장소인지 알 수 없으므로 데이터를 지우지 않고 ValueError)
+    - manifest에 기록되지 않은 벡터(인덱스가 더 김) → 저장소의 해당 청크를 해시해서 manifest에 추가
+    Return:
+        dict: compaction_finished / truncated_chunks / recovered_hashes
+    """
+    report = {"compaction_finished": _finish_compaction(index_path, chunk_path), "truncated_chunks": 0,
+              "recovered_hashes": 0}
+    store_path = chunk_store_path(chunk_path)
+    if not os.path.exists(index_path) or not is_chunk_store(store_path):
+        return report
+
+    ntotal = faiss.read_index(index_path).ntotal
+    store = ChunkStore(store_path)
+    try:
+        if len(store) < ntotal:
+            raise ValueError(f"청크 저장소({len(store)})가 인덱스({ntotal})보다 짧아 복구할 수 없습니다. 전체 빌드를 다시 하세요: {store_path}")
+
+        path = manifest_path(index_path)
+        if not os.path.exists(path) and len(store) > ntotal:
+            raise ValueError(
+                f"manifest 없이 청크 저장소({len(store)})가 인덱스({ntotal})보다 길어 어느 쪽이 맞는지 알 수 없습니다. "
+                f"저장소와 인덱스를 확인하거나 전체 빌드를 다시 하세요: {store_path}"
+            )
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["count"] > ntotal:
+                raise ValueError(f"manifest({manifest['count']})가 인덱스({ntotal})보다 앞서 있어 복구할 수 없습니다: {path}")
+            if manifest["count"] < ntotal:
+                hashes, tombstones = manifest["hashes"], set(manifest["tombstones"])
+                for i in range(manifest["count"], ntotal):
+                    h = chunk_hash(store[i])
+                    if h in hashes:
+                        tombstones.add(i)
+                    else:
+                        hashes[h] = i
+                report["recovered_hashes"] = ntotal - manifest["count"]
+                manifest.update({"count": ntotal, "hashes": hashes, "tombstones": sorted(tombstones)})
+                _write_tombstones(index_path, manifest["tombstones"])
+                _write_json(path, manifest)
+        extra = len(store) - ntotal
+    finally:
+        store.close()
+
+    if extra:
+        ChunkStoreWriter(store_path, append=True, truncate_to=ntotal).close()
+        report["truncated_chunks"] = extra
+    if any(report.values()):
+        print(f"중단된 업데이트 복구 : {report}")
+    return report
+
+
+def _load_chunks_for_bootstrap(chunk_path: str):
+    store_path = chunk_store_path(chunk_path)
+    if is_chunk_store(store_path):
+        return ChunkStore(store_path)
+    # 예전 텍스트 파일이면 청크 저장소로 옮겨 두고 이후에는 그 뒤에 추가
+    chunks = load_legacy_chunks(chunk_path)
+    with ChunkStoreWriter(store_path) as writer:
+        writer.add_many(chunks)
+    return ChunkStore(store_path)
+
+
+def load_manifest(index_path: str, chunk_path: str) -> dict:
+    """
+    manifest 로드. 없으면 기존 청크 저장소를 해시해서 만든다.
+    같은 내용의 청크가 여러 번 들어 있으면 첫 id만 남기고 나머지는 tombstone 처리.
+    """
+    path = manifest_path(index_path)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"지원하지 않는 manifest 버전입니다: {path}")
+        return manifest
+
+    chunks = _load_chunks_for_bootstrap(chunk_path)
+    hashes, tombstones = {}, []
+    for i, chunk in enumerate(chunks):
+        h = chunk_hash(chunk)
+        if h in hashes:
+            tombstones.append(i)
+        else:
+            hashes[h] = i
+    if os.path.exists(tombstones_path(index_path)):
+        tombstones += np.load(tombstones_path(index_path)).tolist()
+    return {"version": MANIFEST_VERSION, "count": len(chunks), "hashes": hashes, "tombstones": sorted(set(tombstones))}
+
+
+def _read_base_index(index_path: str):
+    index = faiss.read_index(index_path)
+    if os.path.exists(params_path(index_path)):
+        with open(params_path(index_path), "r", encoding="utf-8") as f:
+            if json.load(f).get("rerank_k_factor"):
+                raise ValueError("재정렬(rerank) 인덱스는 원본 벡터 파일까지 다시 써야 하므로 증분 업데이트 대신 전체 빌드를 사용하세요")
+    return index
+
+
+def _encode(encode_fn, texts, batch_size: int) -> np.ndarray:
+    embeddings = np.ascontiguousarray(encode_fn(texts, batch_size=batch_size), dtype="float32")
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def update_index(chunks, index_path: str, chunk_path: str, encode_fn, batch_size: int = 64) -> dict:
+    """
+    현재 원본 청크 목록과 manifest를 비교해서 새 청크만 임베딩/추가하고, 사라진 청크는 tombstone 처리
+
+    Input:
+        chunks (list): 원본 파일의 전체 청크 (이번 데이터 드롭 기준)
+        index_path (str): 기존 FAISS 인덱스 파일
+        chunk_path (str): 청크 경로 (.txt 경로를 주면 <이름>.chunks 저장소 사용)
+        encode_fn: SentenceTransformer.encode 처럼 (texts, batch_size=...) → (N, D)
+    Return:
+        dict: added / removed / restored / unchanged / tombstones / total
+    """
+    repair(index_path, chunk_path)
+    index = _read_base_index(index_path)
+    manifest = load_manifest(index_path, chunk_path)
+    store_path = chunk_store_path(chunk_path)
+    if manifest["count"] != index.ntotal:
+        raise ValueError(f"manifest({manifest['count']})와 인덱스({index.ntotal}) 벡터 수가 다릅니다: {index_path}")
+    if not os.path.exists(manifest_path(index_path)):
+        # 첫 업데이트 : 청크를 추가하기 전에 기준 manifest부터 기록 (중간에 멈춰도 repair가 잘라낼 기준이 남도록)
+        _write_json(manifest_path(index_path), manifest)
+
+    hashes = manifest["hashes"]
+    tombstones = set(manifest["tombstones"])
+    incoming, new_texts = {}, []
+    for chunk in chunks:
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        h = chunk_hash(chunk)
+        if h in incoming:
+            continue
+        incoming[h] = chunk
+        if h not in hashes:
+            new_texts.append((h, chunk))
+
+    removed = [i for h, i in hashes.items() if h not in incoming and i not in tombstones]
+    restored = [i for h, i in hashes.items() if h in incoming and i in tombstones]
+    tombstones.update(removed)
+    tombstones.difference_update(restored)
+
+    if new_texts:
+        embeddings = _encode(encode_fn, [text for _, text in new_texts], batch_size)
+        start = index.ntotal
+        index.add(embeddings)
+        # 순서 : 청크 저장소 추가 확정 → 인덱스 교체 → manifest 교체(커밋). 중간에 멈추면 repair()가 맞춰 준다
+        # 커밋되지 않은 이전 추가분은 잘라내고 그 뒤에 이어 쓴다
+        with ChunkStoreWriter(store_path, append=True, truncate_to=start) as writer:
+            for offset, (h, text) in enumerate(new_texts):
+                writer.add(text)
+                hashes[h] = start + offset
+        _replace_atomic(index_path, lambda tmp_path: faiss.write_index(index, tmp_path))
+
+    manifest.update({"count": index.ntotal, "hashes": hashes, "tombstones": sorted(tombstones)})
+    _write_tombstones(index_path, manifest["tombstones"])
+    _write_json(manifest_path(index_path), manifest)
+
+    report = {
+        "added": len(new_texts),
+        "removed": len(removed),
+        "restored": len(restored),
+        "unchanged": len(incoming) - len(new_texts) - len(restored),
+        "tombstones": len(tombstones),
+        "total": index.ntotal,
+    }
+    print(f"증분 업데이트 : {report}")
+    if index.ntotal and len(tombstones) / index.ntotal > COMPACT_RATIO:
+        print(f"[안내] 삭제 비율이 {COMPACT_RATIO:.0%}를 넘었습니다. compact()로 정리하면 검색이 빨라집니다.")
+    return report
+
+
+def _live_vectors(index, live_ids: np.ndarray, encode_fn, texts, batch_size: int) -> np.ndarray:
+    """살아있는 벡터 꺼내기 : 무손실 인덱스는 reconstruct, PQ 계열은 다시 임베딩"""
+    if encode_fn is not None:
+        return _encode(encode_fn, texts, batch_size)
+    base = faiss.downcast_index(index)
+    if not isinstance(base, (faiss.IndexFlat, faiss.IndexHNSWFlat, faiss.IndexIVFFlat)):
+        raise ValueError("PQ 계열 인덱스는 복원하면 손실이 생기므로 encode_fn을 주고 다시 임베딩하세요")
+    if isinstance(base, faiss.IndexIVFFlat):
+        base.make_direct_map()
+    if not len(live_ids):
+        return np.empty((0, index.d), dtype="float32")
+    return np.ascontiguousarray(base.reconstruct_batch(live_ids), dtype="float32")
+
+
+def compact(index_path: str, chunk_path: str, encode_fn=None, batch_size: int = 64) -> dict:
+    """
+    tombstone된 벡터/청크를 실제로 지우고 id를 0부터 다시 매김 (학습된 양자화기는 그대로 재사용)
+
+    Input:
+        encode_fn: PQ 계열 인덱스일 때 필요 (None이면 인덱스에서 벡터 복원)
+    """
+    repair(index_path, chunk_path)
+    index = _read_base_index(index_path)
+    manifest = load_manifest(index_path, chunk_path)
+    store_path = chunk_store_path(chunk_path)
+    old_chunks = ChunkStore(store_path)
+    tombstones = set(manifest["tombstones"])
+    live_ids = np.array([i for i in range(index.ntotal) if i not in tombstones], dtype="int64")
+    texts = [old_chunks[int(i)] for i in live_ids]
+
+    vectors = _live_vectors(index, live_ids, encode_fn, texts, batch_size)
+    new_index = faiss.clone_index(index)
+    new_index.reset()
+    new_index.add(vectors)
+
+    # .compact로 새 저장소 / 인덱스 / manifest를 모두 만든 뒤 저널을 남기면(커밋) 교체 시작
+    new_store = store_path + ".compact"
+    _remove_path(new_store)
+    with ChunkStoreWriter(new_store) as writer:
+        writer.add_many(texts)
+    old_chunks.close()
+
+    _replace_atomic(index_path + ".compact", lambda tmp_path: faiss.write_index(new_index, tmp_path))
+    hashes = {chunk_hash(text): i for i, text in enumerate(texts)}
+    _write_json(manifest_path(index_path) + ".compact", {
+        "version": MANIFEST_VERSION, "count": new_index.ntotal, "hashes": hashes, "tombstones": [],
+    })
+    _write_json(compact_journal_path(index_path), {"count": new_index.ntotal})
+    _finish_compaction(index_path, chunk_path)
+
+    report = {"removed": len(tombstones), "total": new_index.ntotal}
+    print(f"컴팩션 완료 : {report}")
+    return report
@@ -0,0 +1,446 @@
+# ✅ rag/index_factory.py
+# 내적(코사인) FAISS 인덱스 생성기 : Flat / IVF-Flat / HNSW / PQ / IVF-PQ / OPQ+IVF-PQ
+# - IVF·PQ 계열은 표본(train_size)으로만 학습해서 큰 코퍼스에서도 학습 비용이 일정
+# - 검색 파라미터(nprobe, efSearch)는 인덱스 옆 <인덱스>.params.json 에 저장하고 read_index()에서 적용
+# - 압축 인덱스는 RerankedIndex로 감싸 상위 후보를 memory-map한 원본 벡터(<인덱스>.vectors.npy)로 정확히 재정렬 가능
+# - 증분 업데이트(rag/incremental_index.py)로 지워진 벡터 id는 <인덱스>.tombstones.npy 에 기록되고 검색 결과에서 빠진다
+# - 리포트 : Flat 기준 recall@k + 질의 지연시간 비교
+#
+# 사용법 : python -m rag.index_factory vector_db/QA_random_pair_part1_index1.index --types flat,ivf_flat,hnsw,ivf_pq
+#          (기존 Flat 인덱스의 벡터를 꺼내 각 설정으로 다시 만들고 비교, --rerank 4 로 재정렬 변형도 비교)
+# 빌드 스크립트 기본 인덱스 종류는 환경변수 FAISS_INDEX_TYPE (기본 flat)
+
+import os
+import json
+import math
+import time
+import argparse
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "pq", "ivf_pq", "opq_ivf_pq")
+COMPRESSED_TYPES = ("pq", "ivf_pq", "opq_ivf_pq")
+DEFAULT_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+
+DEFAULT_PARAMS = {
+    "nlist": None,         # IVF 셀 수 (None이면 4 * sqrt(N))
+    "nprobe": 16,          # IVF 검색 시 탐색할 셀 수
+    "hnsw_m": 32,          # HNSW 이웃 수
+    "ef_construction": 200,
+    "ef_search": 64,       # HNSW 검색 후보 수
+    "pq_m": 16,            # PQ 서브벡터 수 (차원의 약수, 벡터당 pq_m * nbits / 8 바이트)
+    "pq_nbits": 8,
+    "rerank_k_factor": 0,  # > 0이면 top-k * 배수 후보를 원본 벡터로 재정렬 (압축 인덱스 전용)
+    "train_size": 100_000, # 학습 표본 상한
+}
+
+
+def params_path(index_path: str) -> str:
+    return index_path + ".params.json"
+
+
+def _nlist_for(n: int, nlist=None) -> int:
+    nlist = nlist or int(4 * math.sqrt(n))
+    # faiss 권장 : 셀당 학습 벡터 39개 이상
+    return max(1, min(nlist, n // 39))
+
+
+def factory_string(index_type: str, n: int, d: int, params: dict) -> str:
+    """인덱스 종류 + 파라미터 → faiss.index_factory 문자열"""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{_nlist_for(n, params['nlist'])},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params['hnsw_m']},Flat"
+    if index_type in COMPRESSED_TYPES:
+        m = params["pq_m"]
+        if d % m:
+            raise ValueError(f"pq_m({m})이 차원({d})의 약수가 아닙니다")
+        # 코드북 학습에 2^nbits * 39개 정도가 필요하므로 작은 코퍼스에서는 nbits를 낮춘다
+        nbits = min(params["pq_nbits"], max(4, int(math.log2(max(n // 39, 16)))))
+        if index_type == "pq":
+            return f"PQ{m}x{nbits}"
+        ivf_pq = f"IVF{_nlist_for(n, params['nlist'])},PQ{m}x{nbits}"
+        # OPQ : PQ 전에 회전 행렬을 학습해서 서브벡터 간 분산을 고르게 → 같은 크기에서 recall 향상
+        return ivf_pq if index_type == "ivf_pq" else f"OPQ{m},{ivf_pq}"
+    raise ValueError(f"지원하지 않는 인덱스 종류입니다: {index_type} (가능: {', '.join(INDEX_TYPES)})")
+
+
+def vectors_path(index_path: str) -> str:
+    return index_path + ".vectors.npy"
+
+
+class RerankedIndex:
+    """
+    압축 인덱스 + 원본 벡터 재정렬.
+    압축 인덱스에서 top-k * k_factor개 후보를 찾고, memory-map한 float32 원본 벡터로 정확한 내적을 다시 계산해 top-k를 고른다.
+    원본 벡터는 디스크/페이지 캐시에만 있고 후보 행만 읽으므로 워커별 상주 메모리는 압축 인덱스 크기 수준이다.
+    faiss 인덱스처럼 search / ntotal / d / metric_type 을 제공한다.
+    """
+    def __init__(self, index, vectors, k_factor: int = 4):
+        if len(vectors) != index.ntotal:
+            raise ValueError(f"재정렬 벡터 수({len(vectors)})와 인덱스 벡터 수({index.ntotal})가 다릅니다")
+        self.index = index
+        self.vectors = vectors
+        self.k_factor = k_factor
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    @property
+    def d(self):
+        return self.index.d
+
+    @property
+    def metric_type(self):
+        return self.index.metric_type
+
+    def search(self, queries, k: int, params=None):
+        """params : 압축 인덱스 검색에 넘길 faiss.SearchParameters (tombstone selector 등)"""
+        queries = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.d)
+        n_candidates = min(self.ntotal, k * self.k_factor)
+        if params is None:
+            _, candidates = self.index.search(queries, n_candidates)
+        else:
+            _, candidates = self.index.search(queries, n_candidates, params=params)
+        scores = np.full((len(queries), k), -np.inf, dtype="float32")
+        ids = np.full((len(queries), k), -1, dtype="int64")
+        for qi, (query, cand) in enumerate(zip(queries, candidates)):
+            cand = np.sort(cand[cand >= 0])  # 정렬된 id로 읽어야 memmap 접근이 순차적
+            exact = np.asarray(self.vectors[cand], dtype="float32") @ query
+            top = np.argsort(-exact)[:k]
+            scores[qi, :len(top)] = exact[top]
+            ids[qi, :len(top)] = cand[top]
+        return scores, ids
+
+
+def tombstones_path(index_path: str) -> str:
+    return index_path + ".tombstones.npy"
+
+
+class TombstoneFilteredIndex:
+    """
+    삭제 표시(tombstone)된 벡터 id를 검색 결과에서 제외하는 래퍼.
+    faiss selector(IDSelectorNot + IDSelectorBatch)를 검색 파라미터로 넘겨 검색 중에 건너뛰므로
+    삭제 수가 늘어도 질의 비용은 그대로다 (IVF는 nprobe, HNSW는 efSearch를 그대로 유지).
+    selector를 지원하지 않는 인덱스/faiss 버전에서는 최대 k * OVERFETCH_FACTOR개만 더 찾아서 걸러낸다
+    (그래도 모자라면 top-k보다 적게 나오므로 incremental_index.compact()로 정리).
+    """
+    OVERFETCH_FACTOR = 8
+
+    def __init__(self, index, tombstones):
+        self.index = index
+        self.tombstones = np.unique(np.asarray(tombstones, dtype="int64"))
+        try:
+            # SearchParameters는 selector를 포인터로만 들고 있으므로 파이썬 객체를 여기서 잡아 둔다
+            self._batch = faiss.IDSelectorBatch(self.tombstones)
+            self._selector = faiss.IDSelectorNot(self._batch)
+            self._use_selector = True
+        except (AttributeError, TypeError):
+            self._use_selector = False
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    @property
+    def d(self):
+        return self.index.d
+
+    @property
+    def metric_type(self):
+        return self.index.metric_type
+
+    def _search_parameters(self, index):
+        """
+        현재 nprobe / efSearch에 tombstone selector를 붙인 검색 파라미터
+        Return:
+            (params, 참조 유지용 리스트) : 하위 파라미터 객체가 검색 중에 해제되지 않도록 같이 들고 있는다
+        """
+        index = faiss.downcast_index(index)
+        if isinstance(index, faiss.IndexPreTransform):  # OPQ
+            inner, keep = self._search_parameters(index.index)
+            params = faiss.SearchParametersPreTransform()
+            params.index_params = inner
+            return params, keep + [inner]
+        if isinstance(index, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF()
+            params.nprobe = index.nprobe
+        elif isinstance(index, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = index.hnsw.efSearch
+        else:
+            params = faiss.SearchParameters()
+        params.sel = self._selector
+        return params, []
+
+    def _search_with_selector(self, queries, k: int):
+        base = self.index.index if isinstance(self.index, RerankedIndex) else self.index
+        params, _keep = self._search_parameters(base)
+        # RerankedIndex는 params를 압축 인덱스 후보 검색에 넘긴다
+        return self.index.search(queries, k, params=params)
+
+    def _search_with_overfetch(self, queries, k: int):
+        extra = min(len(self.tombstones), k * self.OVERFETCH_FACTOR)
+        scores, ids = self.index.search(queries, min(self.ntotal, k + extra))
+        dropped = (ids < 0) | np.isin(ids, self.tombstones)
+        # 안정 정렬로 살아있는 결과를 원래 순서대로 앞으로 모음
+        order = np.argsort(dropped, axis=1, kind="stable")[:, :k]
+        scores = np.take_along_axis(scores, order, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+        dropped = np.take_along_axis(dropped, order, axis=1)
+        scores[dropped], ids[dropped] = -np.inf, -1
+        if ids.shape[1] < k:
+            pad = k - ids.shape[1]
+            scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+        return scores, ids
+
+    def search(self, queries, k: int):
+        queries = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.d)
+        if self._use_selector:
+            try:
+                return self._search_with_selector(queries, k)
+            except (RuntimeError, TypeError, AttributeError):
+                # 이 인덱스 종류는 검색 파라미터 selector 미지원 → 이후로는 제한된 over-fetch
+                self._use_selector = False
+        return self._search_with_overfetch(queries, k)
+
+
+def search_params(index) -> dict:
+    """인덱스에 현재 설정된 검색 파라미터 (params.json 저장용)"""
+    params = {}
+    if isinstance(index, TombstoneFilteredIndex):
+        index = index.index
+    if isinstance(index, RerankedIndex):
+        params["rerank_k_factor"] = index.k_factor
+        index = index.index
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params["nprobe"] = int(ivf.nprobe)
+    if hasattr(index, "hnsw"):
+        params["efSearch"] = int(index.hnsw.efSearch)
+    return params
+
+
+def apply_search_params(index, params: dict):
+    """nprobe / efSearch 적용 (해당 없는 파라미터는 무시)"""
+    if isinstance(index, TombstoneFilteredIndex):
+        apply_search_params(index.index, params)
+        return index
+    if isinstance(index, RerankedIndex):
+        if "rerank_k_factor" in params:
+            index.k_factor = int(params["rerank_k_factor"])
+        apply_search_params(index.index, params)
+        return index
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and "nprobe" in params:
+        ivf.nprobe = int(params["nprobe"])
+    if hasattr(index, "hnsw") and "efSearch" in params:
+        index.hnsw.efSearch = int(params["efSearch"])
+    return index
+
+
+def build_index(embeddings, index_type: str = None, seed: int = 0, **overrides):
+    """
+    L2 정규화된 (N, D) 임베딩으로 내적 인덱스 생성. IVF 계열은 최대 train_size개 표본으로 학습.
+
+    Input:
+        embeddings (np.ndarray): 정규화된 float32 벡터
+        index_type (str): flat | ivf_flat | hnsw | pq | ivf_pq | opq_ivf_pq (None이면 FAISS_INDEX_TYPE)
+        overrides: DEFAULT_PARAMS 덮어쓰기 (nprobe=32, rerank_k_factor=4 등)
+    Return:
+        faiss.Index: 벡터가 추가되고 검색 파라미터가 설정된 인덱스
+        (압축 인덱스 + rerank_k_factor > 0이면 embeddings를 원본으로 쓰는 RerankedIndex)
+    """
+    index_type = index_type or DEFAULT_INDEX_TYPE
+    params = {**DEFAULT_PARAMS, **overrides}
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    n, d = embeddings.shape
+
+    spec = factory_string(index_type, n, d, params)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        index = faiss.index_factory(d, spec, faiss.METRIC_INNER_PRODUCT)
+
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(n, size=min(n, params["train_size"]), replace=False)
+        index.train(embeddings[np.sort(sample)])
+
+    index.add(embeddings)
+    apply_search_params(index, {"nprobe": params["nprobe"], "efSearch": params["ef_search"]})
+    print(f"FAISS 인덱스 생성 : {spec} ({n}개 벡터)")
+    if params["rerank_k_factor"] > 0:
+        if index_type not in COMPRESSED_TYPES:
+            raise ValueError(f"재정렬은 압축 인덱스({', '.join(COMPRESSED_TYPES)})에서만 의미가 있습니다: {index_type}")
+        index = RerankedIndex(index, embeddings, params["rerank_k_factor"])
+    return index
+
+
+def write_index(index, index_path: str):
+    """
+    인덱스 + 검색 파라미터(params.json) 저장.
+    RerankedIndex면 압축 인덱스와 원본 벡터(<인덱스>.vectors.npy, float32)를 따로 저장한다.
+    """
+    params = search_params(index)
+    if isinstance(index, TombstoneFilteredIndex):
+        np.save(tombstones_path(index_path), index.tombstones)
+        index = index.index
+    elif os.path.exists(tombstones_path(index_path)):
+        os.remove(tombstones_path(index_path))
+    if isinstance(index, RerankedIndex):
+        if not (isinstance(index.vectors, np.memmap) and index.vectors.filename == os.path.abspath(vectors_path(index_path))):
+            np.save(vectors_path(index_path), np.asarray(index.vectors, dtype="float32"))
+        index = index.index
+    faiss.write_index(index, index_path)
+    if params:
+        with open(params_path(index_path), "w", encoding="utf-8") as f:
+            json.dump(params, f, indent=2)
+    elif os.path.exists(params_path(index_path)):
+        os.remove(params_path(index_path))
+
+
+def read_index(index_path: str):
+    """
+    인덱스를 읽고 params.json이 있으면 검색 파라미터 적용.
+    rerank_k_factor가 있으면 원본 벡터를 memory-map해서 RerankedIndex로,
+    tombstones.npy가 있으면 TombstoneFilteredIndex로 감싼다.
+    """
+    index = faiss.read_index(index_path)
+    if os.path.exists(params_path(index_path)):
+        with open(params_path(index_path), "r", encoding="utf-8") as f:
+            params = json.load(f)
+        if params.get("rerank_k_factor"):
+            vectors = np.load(vectors_path(index_path), mmap_mode="r")
+            index = RerankedIndex(index, vectors, params["rerank_k_factor"])
+        apply_search_params(index, params)
+    if os.path.exists(tombstones_path(index_path)):
+        tombstones = np.load(tombstones_path(index_path))
+        if len(tombstones):
+            index = TombstoneFilteredIndex(index, tombstones)
+    return index
+
+
+# ---- recall / 지연시간 리포트 ----
+
+def _latency(index, queries: np.ndarray, k: int) -> dict:
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q.reshape(1, -1), k)
+        times.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    index.search(queries, k)
+    batch_s = time.perf_counter() - start
+    times = np.array(times)
+    return {
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "batch_qps": float(len(queries) / batch_s),
+    }
+
+
+def recall_at_k(truth_ids: np.ndarray, ids: np.ndarray) -> float:
+    k = truth_ids.shape[1]
+    hits = sum(len(set(t) & set(r[r >= 0])) for t, r in zip(truth_ids, ids))
+    return hits / (len(truth_ids) * k)
+
+
+def evaluate_configs(embeddings, queries, configs, k: int = 10) -> list:
+    """
+    configs의 각 설정을 만들어 Flat 기준 recall@k, 지연시간, 인덱스 크기 비교
+
+    Input:
+        configs (list): [{"index_type": "ivf_flat", "nprobe": 16, ...}, ...]
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    baseline = faiss.IndexFlatIP(embeddings.shape[1])
+    baseline.add(embeddings)
+    _, truth = baseline.search(queries, k)
+
+    rows = []
+    for config in configs:
+        config = dict(config)
+        index_type = config.pop("index_type")
+        start = time.perf_counter()
+        index = build_index(embeddings, index_type, **config)
+        build_s = time.perf_counter() - start
+        _, ids = index.search(queries, k)
+        # 워커에 상주하는 건 faiss 인덱스뿐 (재정렬용 원본 벡터는 memory-map)
+        index_bytes = faiss.serialize_index(index.index if isinstance(index, RerankedIndex) else index).nbytes
+        rows.append({
+            "index_type": index_type,
+            **config,
+            **search_params(index),
+            f"recall@{k}": recall_at_k(truth, ids),
+            "build_s": build_s,
+            "index_mb": index_bytes / 2**20,
+            "bytes_per_vector": index_bytes / len(embeddings),
+            "compression": embeddings.shape[1] * 4 / (index_bytes / len(embeddings)),
+            **_latency(index, queries, k),
+        })
+    return rows
+
+
+def _vectors_from_index(index_path: str) -> np.ndarray:
+    index = faiss.read_index(index_path)
+    vectors = np.ascontiguousarray(index.reconstruct_n(0, index.ntotal), dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="인덱스 종류별 recall@k / 지연시간 리포트 (Flat 기준)")
+    parser.add_argument("index_path", help="벡터를 꺼낼 기존 Flat 인덱스")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--nprobe", default="8,16,32", help="IVF 계열 nprobe 후보")
+    parser.add_argument("--ef-search", default="32,64,128", help="HNSW efSearch 후보")
+    parser.add_argument("--pq-m", type=int, default=DEFAULT_PARAMS["pq_m"], help="PQ 서브벡터 수")
+    parser.add_argument("--rerank", type=int, default=0, help="> 0이면 압축 인덱스마다 원본 벡터 재정렬 변형도 비교 (후보 배수)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    vectors = _vectors_from_index(args.index_path)
+    rng = np.random.default_rng(args.seed)
+    # 질의 : 코퍼스 벡터에 작은 잡음을 더해 자기 자신만 찾는 상황을 피함
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype("float32")
+    faiss.normalize_L2(queries)
+
+    configs = []
+    for index_type in args.types.split(","):
+        if index_type in ("ivf_flat", "ivf_pq", "opq_ivf_pq"):
+            type_configs = [{"index_type": index_type, "nprobe": int(p)} for p in args.nprobe.split(",")]
+        elif index_type == "hnsw":
+            type_configs = [{"index_type": index_type, "ef_search": int(e)} for e in args.ef_search.split(",")]
+        else:
+            type_configs = [{"index_type": index_type}]
+        if index_type in COMPRESSED_TYPES:
+            type_configs = [{**c, "pq_m": args.pq_m} for c in type_configs]
+            if args.rerank > 0:
+                type_configs += [{**c, "rerank_k_factor": args.rerank} for c in type_configs]
+        configs += type_configs
+
+    rows = evaluate_configs(vectors, queries, configs, k=args.k)
+    recall_key = f"recall@{args.k}"
+    print(f"\n벡터 {len(vectors)}개, 질의 {len(queries)}개")
+    print(f"{'설정':<40} {recall_key:>10} {'p50(ms)':>9} {'p95(ms)':>9} {'QPS':>9} {'MB':>8} {'B/vec':>7} {'압축':>6}")
+    for row in rows:
+        name = row["index_type"] + "".join(
+            f" {k}={row[k]}" for k in ("nprobe", "efSearch", "rerank_k_factor") if row.get(k)
+        )
+        print(f"{name:<40} {row[recall_key]:>10.4f} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} "
+              f"{row['batch_qps']:>9.0f} {row['index_mb']:>8.1f} {row['bytes_per_vector']:>7.0f} {row['compression']:>5.1f}x")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"n": len(vectors), "queries": len(queries), "results": rows}, f, ensure_ascii=False, indent=2)
+        print(f"리포트 저장 : {args.output}")
@@ -1,12 +1,9 @@
 import torch
-from langchain_huggingface import HuggingFaceEmbeddings
+from rag.model_registry import SharedHuggingFaceEmbeddings, MINILM
 
 # 디바이스 설정
 device = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"현재 디바이스: {device.upper()}")
 
-# HuggingFace 임베딩 모델 초기화
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-    model_kwargs={"device": device}
-)
+# HuggingFace 임베딩 모델 초기화 (프로세스 공용 레지스트리의 all-MiniLM 사용)
+embedding_model = SharedHuggingFaceEmbeddings(model_name=MINILM, device=device)
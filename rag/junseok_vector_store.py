@@ -1,26 +1,31 @@
 import os
 import json
-import pickle
-from tqdm import tqdm
-from langchain.vectorstores import FAISS
-from rag.embedder import embedding_model
-from config import VECTOR_DB_DIR
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from rag.junseok_embedder import embedding_model
+from rag.embedding_cache import cached_encode
+from junseok_config import VECTOR_DB_DIR
 
-def build_faiss_index(documents, output_path=VECTOR_DB_DIR):
+def build_faiss_index(documents, output_path=VECTOR_DB_DIR, batch_size=256):
     print("문서 임베딩 중...")
 
-    embeddings = []
-    doc_ids = []
-    categories = []
+    # 모든 청크를 큰 배치로 한 번만 임베딩 (디스크 임베딩 캐시에 있는 텍스트는 모델을 다시 돌리지 않음)
+    # HuggingFaceEmbeddings.embed_documents와 같은 전처리 (줄바꿈 → 공백)
+    texts = [doc.page_content for doc in documents]
+    embeddings = cached_encode(
+        embedding_model.model,
+        [text.replace("\n", " ") for text in texts],
+        batch_size=batch_size,
+        show_progress_bar=True,
+        **embedding_model.encode_kwargs,
+    )
 
-    for i, doc in enumerate(tqdm(documents, desc="Embedding documents")):
-        embedding = embedding_model.embed_query(doc.page_content)
-        embeddings.append(embedding)
-        doc_ids.append(doc.metadata.get("c_id", f"doc_{i}"))
-        categories.append(doc.metadata.get("type", "기타"))
+    doc_ids = [doc.metadata.get("c_id", f"doc_{i}") for i, doc in enumerate(documents)]
+    categories = [doc.metadata.get("type", "기타") for doc in documents]
 
-    vector_db = FAISS.from_texts(
-        texts=[doc.page_content for doc in documents],
+    # 미리 계산한 벡터로 FAISS 저장소 생성 (다시 임베딩하지 않음)
+    vector_db = FAISS.from_embeddings(
+        text_embeddings=list(zip(texts, embeddings)),
         embedding=embedding_model
     )
 
@@ -30,14 +35,14 @@ def build_faiss_index(documents, output_path=VECTOR_DB_DIR):
 
     vector_db.save_local(faiss_dir)
 
-    with open(os.path.join(output_path, "doc_embeddings.pkl"), "wb") as f:
-        pickle.dump(embeddings, f)
-
-    with open(os.path.join(output_path, "doc_ids.json"), "w", encoding="utf-8") as f:
-        json.dump(doc_ids, f, ensure_ascii=False, indent=2)
+    # 임베딩 / id / 카테고리는 압축된 배열로 저장 (np.load(..., mmap_mode="r")로 바로 읽을 수 있음)
+    np.save(os.path.join(output_path, "doc_embeddings.npy"), embeddings.astype(np.float32, copy=False))
+    np.save(os.path.join(output_path, "doc_ids.npy"), np.asarray(doc_ids, dtype=str))
 
-    with open(os.path.join(output_path, "categories.json"), "w", encoding="utf-8") as f:
-        json.dump(categories, f, ensure_ascii=False, indent=2)
+    labels, codes = np.unique(np.asarray(categories, dtype=str), return_inverse=True)
+    np.save(os.path.join(output_path, "category_codes.npy"), codes.astype(np.int16 if len(labels) < 2**15 else np.int32))
+    with open(os.path.join(output_path, "category_labels.json"), "w", encoding="utf-8") as f:
+        json.dump(labels.tolist(), f, ensure_ascii=False, indent=2)
 
     print(f"FAISS 벡터 DB 저장 완료: {output_path}")
     return vector_db
@@ -0,0 +1,43 @@
+# 예전 카테고리 벡터 DB(texts.pkl / categories.pkl / embeddings.pt)를 버전 포맷으로 변환하는 마이그레이션 도구
+# 변환 후에는 서빙 경로에서 torch 없이 memory-map으로 바로 읽고, 워커마다 정규화 사본을 만들지 않는다.
+# 사용법 : python -m rag.migrate_category_db [카테고리 DB 경로] [--dtype float16]  (경로 생략 시 vector_db/category)
+
+import os
+import argparse
+from config import VECTOR_DB_PATH
+from rag.vector_store import load_vector_db, save_category_db, load_category_db, is_category_db
+
+
+def migrate_category_db(path: str, dtype: str = "float32", force: bool = False) -> bool:
+    """
+    같은 폴더에 버전 포맷 파일을 추가로 저장 (예전 pkl/pt 파일은 그대로 둔다)
+
+    Return:
+        bool: 변환했으면 True, 이미 변환되어 있으면 False
+    """
+    if is_category_db(path) and not force:
+        print(f"[스킵] 이미 버전 포맷입니다: {path} (다시 만들려면 --force)")
+        return False
+
+    texts, categories, embeddings = load_vector_db(path)
+    save_category_db(path, texts, categories, embeddings.numpy(), dtype=dtype)
+
+    new_texts, new_categories, new_embeddings = load_category_db(path)
+    mismatched = sum(1 for a, b in zip(categories, new_categories) if str(a) != b)
+    if mismatched:
+        raise ValueError(f"라벨 변환 결과가 원본과 {mismatched}개 다릅니다: {path}")
+    print(
+        f"[완료] {path} : {len(new_texts)}개, {new_embeddings.shape[1]}차원, {dtype}, "
+        f"라벨 {len(new_categories.labels)}종"
+    )
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pkl/pt 카테고리 벡터 DB → 버전 포맷(npy + 청크 저장소) 변환")
+    parser.add_argument("path", nargs="?", default=os.path.join(VECTOR_DB_PATH, "category"))
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="float16은 디스크를 절반으로 줄이지만 로드 시 float32로 올린다")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    migrate_category_db(args.path, dtype=args.dtype, force=args.force)
@@ -0,0 +1,55 @@
+# 기존 IndexFlatL2 파일을 L2 정규화된 IndexFlatIP 파일로 변환하는 마이그레이션 도구
+# 변환 후에는 검색 시 내적 = 코사인 유사도라서 요청마다 전체 벡터를 복사/정규화할 필요가 없음
+# 사용법 : python -m rag.migrate_index_to_ip [인덱스 경로 ...]  (경로를 생략하면 config.VECTOR_DB_PATHS 전체)
+
+import os
+import sys
+import shutil
+import faiss
+from config import VECTOR_DB_PATHS
+from rag.vector_store import to_inner_product_index
+
+
+def migrate_index_file(index_path: str, backup: bool = True) -> bool:
+    """
+    인덱스 파일 하나를 내적 인덱스로 변환해서 같은 경로에 저장
+
+    Input:
+        index_path (str): FAISS 인덱스 파일 경로
+        backup (bool): 원본을 <경로>.l2.bak 으로 남길지 여부
+    Return:
+        bool: 변환했으면 True, 이미 내적 인덱스였으면 False
+    """
+    index = faiss.read_index(index_path)
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        print(f"[스킵] 이미 내적 인덱스입니다: {index_path}")
+        return False
+
+    ip_index = to_inner_product_index(index)
+    if backup:
+        shutil.copyfile(index_path, index_path + ".l2.bak")
+
+    tmp_path = index_path + ".tmp"
+    faiss.write_index(ip_index, tmp_path)
+    os.replace(tmp_path, index_path)
+    print(f"[완료] {index_path} : IndexFlatL2 → IndexFlatIP ({ip_index.ntotal}개 벡터)")
+    return True
+
+
+def default_index_paths() -> list:
+    """config.VECTOR_DB_PATHS에서 중복 없이 인덱스 파일 경로만 추출 (treatment 폴더 제외)"""
+    paths = []
+    for category, (index_path, _) in VECTOR_DB_PATHS.items():
+        if category == "treatment" or index_path in paths:
+            continue
+        paths.append(index_path)
+    return paths
+
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or default_index_paths()
+    for path in targets:
+        if not os.path.isfile(path):
+            print(f"[스킵] 파일이 없습니다: {path}")
+            continue
+        migrate_index_file(path)
@@ -0,0 +1,166 @@
+# ✅ rag/model_registry.py
+# 프로세스 공용 임베딩 모델 레지스트리
+# (모델 이름, 디바이스, 정밀도)마다 SentenceTransformer를 하나만 만들어 모든 모듈이 같이 쓴다.
+# 정밀도(백엔드) : fp32(기본) / fp16(GPU) / int8(CPU 동적 양자화) / onnx(CPU ONNX Runtime)
+# 기본값은 환경변수 EMBEDDER_PRECISION (parity 확인 : python -m rag.embedder_parity)
+
+import io
+import os
+import logging
+import threading
+from langchain_core.embeddings import Embeddings
+
+KO_SROBERTA = "jhgan/ko-sroberta-multitask"
+MINILM = "sentence-transformers/all-MiniLM-L6-v2"
+
+PRECISIONS = ("fp32", "fp16", "int8", "onnx")
+DEFAULT_PRECISION = os.getenv("EMBEDDER_PRECISION", "fp32")
+
+logger = logging.getLogger("chatbot.model_registry")
+
+_models = {}
+_registry_lock = threading.Lock()
+
+
+def default_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+class SharedEmbeddingModel:
+    """
+    레지스트리가 나눠 주는 공유 모델 핸들.
+    encode()는 모델별 락으로 직렬화한다 (HF fast tokenizer는 동시 호출에 안전하지 않음).
+    그 밖의 속성은 원래 SentenceTransformer로 그대로 넘긴다.
+    """
+    def __init__(self, model, model_name: str, device: str, precision: str):
+        self.model = model
+        self.model_name = model_name
+        self.device = device
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._memory_bytes = None
+
+    def encode(self, sentences, **kwargs):
+        with self._lock:
+            return self.model.encode(sentences, **kwargs)
+
+    def memory_bytes(self):
+        """
+        모델 가중치가 차지하는 바이트 수.
+        int8 양자화 레이어는 parameters()에 잡히지 않아 state_dict 직렬화 크기로 잰다.
+        onnx 백엔드는 가중치가 ONNX Runtime 세션 안에 있어 None.
+        가중치는 로드 후 바뀌지 않으므로 처음 한 번만 계산해 둔다 (/metrics 수집마다 직렬화하지 않도록).
+        """
+        if self.precision == "onnx":
+            return None
+        if self._memory_bytes is None:
+            if self.precision == "int8":
+                import torch
+                buffer = io.BytesIO()
+                torch.save(self.model.state_dict(), buffer)
+                self._memory_bytes = buffer.tell()
+            else:
+                tensors = list(self.model.parameters()) + list(self.model.buffers())
+                self._memory_bytes = sum(t.numel() * t.element_size() for t in tensors)
+        return self._memory_bytes
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def _load_model(model_name: str, device: str, precision: str):
+    from sentence_transformers import SentenceTransformer
+
+    if precision not in PRECISIONS:
+        raise ValueError(f"지원하지 않는 precision입니다: {precision} (가능: {PRECISIONS})")
+    if precision in ("int8", "onnx") and device != "cpu":
+        raise ValueError(f"{precision} 백엔드는 CPU 전용입니다 (device={device})")
+
+    if precision == "onnx":
+        # optimum[onnxruntime] 필요. 허브에 onnx 파일이 없으면 처음 로드할 때 export한다.
+        return SentenceTransformer(model_name, device=device, backend="onnx")
+
+    model = SentenceTransformer(model_name, device=device)
+    if precision == "fp16":
+        model = model.half()
+    elif precision == "int8":
+        # Linear 레이어 가중치를 int8로 동적 양자화 (활성값은 실행 시 양자화)
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_embedding_model(model_name: str = KO_SROBERTA, device: str = None, precision: str = None) -> SharedEmbeddingModel:
+    """
+    공유 임베딩 모델 가져오기. 같은 (모델 이름, 디바이스, 정밀도)면 항상 같은 인스턴스를 돌려준다.
+
+    Input:
+        model_name (str): SentenceTransformer 모델 이름
+        device (str): "cpu" / "cuda" (None이면 사용 가능한 디바이스 자동, int8/onnx는 cpu)
+        precision (str): "fp32" / "fp16" / "int8" / "onnx" (None이면 EMBEDDER_PRECISION)
+    Return:
+        SharedEmbeddingModel: 공유 모델 핸들
+    """
+    if precision is None:
+        precision = DEFAULT_PRECISION
+        if device not in (None, "cpu") and precision in ("int8", "onnx"):
+            precision = "fp32"  # GPU를 명시한 경우 CPU 전용 백엔드 대신 fp32
+    device = device or ("cpu" if precision in ("int8", "onnx") else default_device())
+    key = (model_name, device, precision)
+    shared = _models.get(key)
+    if shared is not None:
+        return shared
+
+    with _registry_lock:
+        shared = _models.get(key)
+        if shared is None:
+            logger.info("임베딩 모델 로드", extra={"model": model_name, "device": device, "precision": precision})
+            shared = SharedEmbeddingModel(_load_model(model_name, device, precision), model_name, device, precision)
+            shared.memory_bytes()  # 양자화 직후 크기 계산 (서빙 중 첫 /metrics 수집이 느려지지 않도록)
+            _models[key] = shared
+    return shared
+
+
+def memory_report() -> list:
+    """로드된 모델별 메모리 사용량 (MB)"""
+    report = []
+    for (name, device, precision), shared in list(_models.items()):
+        size = shared.memory_bytes()
+        report.append({
+            "model": name, "device": device, "precision": precision,
+            "memory_mb": round(size / 2**20, 1) if size is not None else None,
+        })
+    return report
+
+
+class SharedHuggingFaceEmbeddings(Embeddings):
+    """
+    HuggingFaceEmbeddings 대신 쓰는 LangChain Embeddings 어댑터.
+    모델을 따로 만들지 않고 레지스트리의 공유 모델을 사용한다 (FAISS.load_local 등에 그대로 전달 가능).
+    """
+    def __init__(self, model_name: str = MINILM, device: str = None, precision: str = "fp32", encode_kwargs: dict = None,
+                 disk_cache: bool = False):
+        # MiniLM(treatment 인덱스)은 기본 fp32 고정. 백엔드를 바꾸려면 precision을 명시
+        # disk_cache=True면 embed_documents가 디스크 임베딩 캐시(rag/embedding_cache.py)를 거친다 (인덱스 빌드용)
+        self.model_name = model_name
+        self.device = device
+        self.precision = precision
+        self.encode_kwargs = encode_kwargs or {}
+        self.disk_cache = disk_cache
+
+    @property
+    def model(self) -> SharedEmbeddingModel:
+        return get_embedding_model(self.model_name, self.device, self.precision)
+
+    def embed_documents(self, texts):
+        # HuggingFaceEmbeddings와 같은 전처리 (줄바꿈 → 공백)
+        texts = [text.replace("\n", " ") for text in texts]
+        if self.disk_cache:
+            from rag.embedding_cache import cached_encode
+            return cached_encode(self.model, texts, show_progress_bar=False, **self.encode_kwargs).tolist()
+        embeddings = self.model.encode(texts, show_progress_bar=False, **self.encode_kwargs)
+        return embeddings.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -0,0 +1,128 @@
+# ✅ rag/query_context.py
+# 요청 하나의 질문 임베딩을 모델별로 최대 한 번만 계산하는 컨텍스트 + 프로세스 공용 LRU 캐시
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from config import EMBEDDING_CACHE_SIZE
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 질문 정규화: 유니코드 NFC, 앞뒤 공백 제거, 연속 공백 하나로"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingLRUCache:
+    """
+    (모델 이름, 정규화된 질문) → 임베딩 벡터를 저장하는 크기 제한 LRU 캐시.
+    저장된 벡터는 읽기 전용이라 여러 요청이 그대로 공유해도 안전하다.
+    """
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        value = np.asarray(value, dtype="float32")
+        value.setflags(write=False)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+embedding_cache = EmbeddingLRUCache()
+
+# 두 모델(ko-sroberta, all-MiniLM)을 동시에 돌리기 위한 공용 스레드 풀
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embed")
+
+
+class QueryContext:
+    """
+    요청 단위 질문 임베딩 컨텍스트
+
+    encoders는 {모델 이름: 텍스트 하나를 받아 (D,) 벡터를 돌려주는 함수} 형식.
+    같은 요청 안에서는 모델별로 한 번만 계산하고, 요청 간에는 embedding_cache를 공유한다.
+    """
+    def __init__(self, text: str, encoders: dict, cache: EmbeddingLRUCache = embedding_cache):
+        self.text = text
+        self.key_text = normalize_query(text)
+        self.encoders = encoders
+        self.cache = cache
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _compute(self, name: str):
+        key = (name, self.key_text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self.cache.put(key, self.encoders[name](self.key_text))
+
+    def _future(self, name: str, background: bool) -> Future:
+        run_inline = False
+        with self._lock:
+            future = self._futures.get(name)
+            if future is None:
+                if background:
+                    future = _executor.submit(self._compute, name)
+                else:
+                    future = Future()
+                    run_inline = True
+                self._futures[name] = future
+        if run_inline:
+            try:
+                future.set_result(self._compute(name))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def seed(self, name: str, emb):
+        """배치로 미리 계산한 임베딩을 넣어 둔다 (run_chatbot_pipeline_batch용)"""
+        value = self.cache.put((name, self.key_text), emb)
+        with self._lock:
+            future = Future()
+            future.set_result(value)
+            self._futures[name] = future
+        return self
+
+    def prefetch(self, *names):
+        """지정한 모델(생략 시 전체)의 임베딩을 백그라운드에서 동시에 계산 시작"""
+        for name in names or self.encoders:
+            self._future(name, background=True)
+        return self
+
+    def embedding(self, name: str) -> np.ndarray:
+        """모델의 원본 임베딩 (D,), 읽기 전용"""
+        return self._future(name, background=False).result()
+
+    def normalized(self, name: str) -> np.ndarray:
+        """모델의 L2 정규화 임베딩 (D,)"""
+        emb = self.embedding(name)
+        return emb / (np.linalg.norm(emb) + 1e-8)
@@ -0,0 +1,149 @@
+# ✅ rag/streaming_builder.py
+# 메모리 상한이 있는 스트리밍 임베딩 + 인덱스 빌더
+# - 원본 파일을 한 줄씩 읽어(청크 = 한 줄) batch_size개씩 임베딩
+# - 배치마다 정규화 벡터는 staging 파일(<인덱스>.staging.f32, memory-map)에, 텍스트는 청크 저장소에 바로 기록
+# - 배치마다 체크포인트(<인덱스>.build.json : 원본 바이트 위치, 처리한 청크 수)를 남겨 중단돼도 이어서 빌드
+# - 끝나면 staging 파일에서 인덱스를 만든다 (IVF/PQ는 staging에서 표본 학습 → 전체 추가)
+# 피크 메모리 ≈ 배치 하나 + 최종 인덱스. 전체 텍스트 리스트나 전체 임베딩 배열을 메모리에 올리지 않는다.
+#
+# staging 파일을 쓰는 이유 : Flat/HNSW도 진행 중인 인덱스를 체크포인트마다 통째로 다시 쓰면 O(N²) 쓰기가 되므로
+# 벡터는 이어 쓰기만 하고 인덱스는 마지막에 한 번 만든다.
+#
+# 사용 예시 : build_streaming("./data/merged_data.txt", index_path, chunk_path, model, index_type="ivf_flat")
+
+import os
+import json
+import numpy as np
+import faiss
+from rag.chunk_store import ChunkStoreWriter, chunk_store_path
+from rag.index_factory import build_index, write_index
+from rag.embedding_cache import cached_encode
+
+
+def checkpoint_path(index_path: str) -> str:
+    return index_path + ".build.json"
+
+
+def staging_path(index_path: str) -> str:
+    return index_path + ".staging.f32"
+
+
+def iter_chunk_lines(file_path: str, start_offset: int = 0):
+    """
+    원본 파일에서 (청크, 다음 줄 시작 바이트 위치)를 하나씩 돌려준다 (빈 줄 제외).
+    바이트 위치는 체크포인트 재개용.
+    """
+    with open(file_path, "rb") as f:
+        f.seek(start_offset)
+        if start_offset == 0 and f.read(3) != b"\xef\xbb\xbf":  # utf-8-sig BOM
+            f.seek(0)
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            text = line.decode("utf-8").strip()
+            if text:
+                yield text, f.tell()
+
+
+def _source_signature(file_path: str) -> dict:
+    stat = os.stat(file_path)
+    return {"source": os.path.abspath(file_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _load_checkpoint(index_path: str, file_path: str):
+    path = checkpoint_path(index_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if {k: checkpoint.get(k) for k in ("source", "size", "mtime")} != _source_signature(file_path):
+        print("[안내] 원본 파일이 바뀌어 체크포인트를 버리고 처음부터 빌드합니다")
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(index_path: str, checkpoint: dict):
+    path = checkpoint_path(index_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _flush_batch(texts, offset, model, writer, staging, checkpoint, index_path, encode_batch_size, use_cache):
+    if use_cache:
+        embeddings = cached_encode(model, texts, batch_size=encode_batch_size, show_progress_bar=False)
+    else:
+        embeddings = np.asarray(model.encode(texts, batch_size=encode_batch_size, show_progress_bar=False), dtype="float32")
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    faiss.normalize_L2(embeddings)
+
+    staging.write(embeddings.tobytes())
+    staging.flush()
+    os.fsync(staging.fileno())
+    writer.add_many(texts)
+    writer.flush()
+
+    checkpoint.update({"offset": offset, "count": writer.count, "dim": int(embeddings.shape[1])})
+    _save_checkpoint(index_path, checkpoint)
+
+
+def build_streaming(file_path: str, index_path: str, chunk_path: str, model, index_type: str = None,
+                    batch_size: int = 2048, encode_batch_size: int = 64, use_cache: bool = True, **params):
+    """
+    원본 파일 → (배치 임베딩 → staging/청크 저장소 기록 → 체크포인트) 반복 → 인덱스 생성/저장.
+    같은 인자로 다시 호출하면 체크포인트부터 이어서 진행한다.
+
+    Input:
+        file_path (str): 한 줄에 청크 하나인 원본 텍스트 파일
+        index_path (str): 저장할 FAISS 인덱스 경로
+        chunk_path (str): 청크 경로 (.txt 경로를 주면 <이름>.chunks 저장소)
+        model: encode(texts, batch_size=...)가 있는 임베딩 모델 (SharedEmbeddingModel 등)
+        index_type (str): flat | ivf_flat | hnsw | pq | ivf_pq | opq_ivf_pq
+        batch_size (int): 한 번에 읽어서 임베딩/기록할 청크 수 (= 체크포인트 간격)
+        use_cache (bool): 디스크 임베딩 캐시 사용 여부
+        params: rag/index_factory.build_index 파라미터
+    Return:
+        faiss.Index: 생성된 인덱스
+    """
+    store_path = chunk_store_path(chunk_path)
+    checkpoint = _load_checkpoint(index_path, file_path)
+    if checkpoint is None:
+        checkpoint = {**_source_signature(file_path), "offset": 0, "count": 0, "dim": None}
+        writer = ChunkStoreWriter(store_path)
+        staging = open(staging_path(index_path), "wb")
+    else:
+        print(f"체크포인트에서 재개 : 청크 {checkpoint['count']}개 처리됨")
+        writer = ChunkStoreWriter(store_path, append=True, truncate_to=checkpoint["count"])
+        staging = open(staging_path(index_path), "r+b")
+        staging.truncate(checkpoint["count"] * (checkpoint["dim"] or 0) * 4)
+        staging.seek(0, os.SEEK_END)
+
+    texts, offset = [], checkpoint["offset"]
+    try:
+        for text, offset in iter_chunk_lines(file_path, checkpoint["offset"]):
+            texts.append(text)
+            if len(texts) >= batch_size:
+                _flush_batch(texts, offset, model, writer, staging, checkpoint, index_path, encode_batch_size, use_cache)
+                print(f"진행 : 청크 {writer.count}개")
+                texts = []
+        if texts:
+            _flush_batch(texts, offset, model, writer, staging, checkpoint, index_path, encode_batch_size, use_cache)
+    finally:
+        staging.close()
+        writer.close()
+
+    count, dim = checkpoint["count"], checkpoint["dim"]
+    if not count:
+        raise ValueError(f"청크가 없습니다: {file_path}")
+    vectors = np.memmap(staging_path(index_path), dtype=np.float32, mode="r", shape=(count, dim))
+    index = build_index(vectors, index_type, **params)
+    write_index(index, index_path)
+    print(f"인덱스 저장 : {index_path} ({index.ntotal}개 벡터)")
+    print(f"청크 저장 : {store_path}")
+
+    del vectors
+    os.remove(staging_path(index_path))
+    os.remove(checkpoint_path(index_path))
+    return index
@@ -3,25 +3,26 @@ import os
 import faiss
 import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from rag.model_registry import get_embedding_model
+from rag.chunk_store import open_chunks
+from rag.index_factory import read_index
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
 
 # 청크 불러오기
 def load_chunks(chunk_path: str):
-    with open(chunk_path, "r", encoding="utf-8") as f:
-        return [c.strip() for c in f.read().split("\n\n") if c.strip()]
+    return open_chunks(chunk_path)
 
 # FAISS 인덱스 불러오기
 def load_faiss_index(index_path: str):
-    return faiss.read_index(index_path)
+    return read_index(index_path)
 
 # 유사한 청크 찾기
 def search_faiss_index(question: str, index, chunks, model, top_k=3):
     embedding = model.encode([question])
     _, indices = index.search(np.array(embedding).astype("float32"), top_k)
-    return [chunks[i] for i in indices[0]]
+    return [chunks[i] for i in indices[0] if i >= 0]  # 결과가 top_k보다 적으면 -1 (IVF/HNSW, tombstone)
 
 # RAG 체인 만들기
 def build_rag_chain():
@@ -50,7 +51,7 @@ if __name__ == "__main__":
 
     index = load_faiss_index("./QA_random_pair_part1_index1.faiss")
     chunks = load_chunks("./QA_random_pair_part1_chunks1.txt")
-    model = SentenceTransformer("jhgan/ko-sroberta-multitask")
+    model = get_embedding_model("jhgan/ko-sroberta-multitask")
     rag_chain = build_rag_chain()
 
     # 예시 질문
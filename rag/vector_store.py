@@ -1,16 +1,25 @@
 # ✅ rag/vector_store.py
 
 import os
+import json
 import pickle
-import torch
+import logging
+import threading
+import numpy as np
 import faiss
-from config import VECTOR_DB_PATH
+from config import VECTOR_DB_PATH, VECTOR_DB_PATHS
+from rag.chunk_store import ChunkStore, ChunkStoreWriter, open_chunks, validate_chunk_count
+from rag.index_factory import read_index
+
+logger = logging.getLogger("chatbot.vector_store")
 
 
 def save_vector_db(save_path, texts, categories, embeddings):
     """
     텍스트, 카테고리, 임베딩 정보를 경로에 저장.
     """
+    import torch
+
     os.makedirs(save_path, exist_ok=True)
     with open(os.path.join(save_path, "texts.pkl"), "wb") as f:
         pickle.dump(texts, f)
@@ -23,27 +32,265 @@ def load_vector_db(load_path):
     """
     저장된 텍스트, 카테고리, 임베딩 불러오기.
     """
+    import torch
+
     texts = pickle.load(open(os.path.join(load_path, "texts.pkl"), "rb"))
     categories = pickle.load(open(os.path.join(load_path, "categories.pkl"), "rb"))
     embeddings = torch.load(os.path.join(load_path, "embeddings.pt"), map_location=torch.device('cpu'))
     return texts, categories, embeddings
 
 
+# ---- 카테고리 벡터 DB (버전 포맷) ----
+# <경로>/category_db.json     형식/버전/개수/차원/dtype/라벨 표
+# <경로>/embeddings.npy       L2 정규화된 임베딩 (N, D) float32(기본) 또는 float16, memory-map으로 읽음
+# <경로>/category_codes.npy   라벨 표의 정수 코드 (N,)
+# <경로>/texts.chunks         텍스트 청크 저장소 (rag/chunk_store.py)
+# 예전 texts.pkl / categories.pkl / embeddings.pt 는 python -m rag.migrate_category_db 로 변환한다.
+CATEGORY_DB_FORMAT = "category_db"
+CATEGORY_DB_VERSION = 1
+_CATEGORY_META = "category_db.json"
+
+
+class CategoryLabels:
+    """
+    정수 코드 배열 + 라벨 표를 리스트처럼 보이게 하는 읽기 전용 시퀀스 (categories[i] → 라벨 문자열)
+    """
+    def __init__(self, codes, labels):
+        self.codes = codes
+        self.labels = tuple(labels)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.labels[int(self.codes[i])]
+
+    def __iter__(self):
+        for code in self.codes:
+            yield self.labels[int(code)]
+
+
+def is_category_db(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, _CATEGORY_META))
+
+
+def save_category_db(save_path, texts, categories, embeddings, dtype: str = "float32"):
+    """
+    카테고리 벡터 DB를 버전 포맷으로 저장. 임베딩은 여기서 L2 정규화하고,
+    라벨은 정수 코드 + 라벨 표로 저장한다. 메타 파일을 마지막에 써서 중간에 멈춘 저장은 읽히지 않는다.
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"지원하지 않는 dtype입니다: {dtype}")
+    embeddings = np.asarray(embeddings, dtype="float32")
+    if not (len(texts) == len(categories) == len(embeddings)):
+        raise ValueError(f"개수가 다릅니다: texts={len(texts)}, categories={len(categories)}, embeddings={len(embeddings)}")
+
+    os.makedirs(save_path, exist_ok=True)
+    embeddings_norm = embeddings / (np.linalg.norm(embeddings, axis=-1, keepdims=True) + 1e-8)
+    np.save(os.path.join(save_path, "embeddings.npy"), embeddings_norm.astype(dtype))
+
+    labels, codes = np.unique(np.asarray(categories, dtype=str), return_inverse=True)
+    code_dtype = np.int16 if len(labels) < 2**15 else np.int32
+    np.save(os.path.join(save_path, "category_codes.npy"), codes.astype(code_dtype))
+
+    with ChunkStoreWriter(os.path.join(save_path, "texts.chunks")) as writer:
+        writer.add_many(texts)
+
+    meta = {
+        "format": CATEGORY_DB_FORMAT,
+        "version": CATEGORY_DB_VERSION,
+        "count": len(texts),
+        "dim": int(embeddings.shape[1]),
+        "dtype": dtype,
+        "normalized": True,
+        "labels": [str(label) for label in labels],
+    }
+    tmp_path = os.path.join(save_path, _CATEGORY_META + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(save_path, _CATEGORY_META))
+
+
+def load_category_db(load_path):
+    """
+    버전 포맷 카테고리 벡터 DB 로드 (torch 불필요).
+
+    Return:
+        (texts: ChunkStore, categories: CategoryLabels, embeddings_norm: np.ndarray (N, D))
+        float32 임베딩은 memory-map 그대로(워커 간 페이지 캐시 공유),
+        float16은 행렬 곱 때마다 변환하지 않도록 로드 시 한 번 float32로 올린다.
+    """
+    with open(os.path.join(load_path, _CATEGORY_META), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != CATEGORY_DB_FORMAT or meta.get("version") != CATEGORY_DB_VERSION:
+        raise ValueError(f"지원하지 않는 카테고리 DB 형식입니다: {load_path} ({meta.get('format')} v{meta.get('version')})")
+
+    embeddings_norm = np.load(os.path.join(load_path, "embeddings.npy"), mmap_mode="r")
+    if embeddings_norm.dtype != np.float32:
+        embeddings_norm = np.asarray(embeddings_norm, dtype=np.float32)
+    codes = np.load(os.path.join(load_path, "category_codes.npy"), mmap_mode="r")
+    texts = ChunkStore(os.path.join(load_path, "texts.chunks"))
+
+    count = meta["count"]
+    if not (len(texts) == len(codes) == len(embeddings_norm) == count):
+        raise ValueError(
+            f"카테고리 DB 개수가 맞지 않습니다: {load_path} "
+            f"(meta={count}, texts={len(texts)}, codes={len(codes)}, embeddings={len(embeddings_norm)})"
+        )
+    return texts, CategoryLabels(codes, meta["labels"]), embeddings_norm
+
+
 def load_category_vector_db():
     """
-    카테고리 분류용 벡터 DB (category 폴더 기준)
+    카테고리 분류용 벡터 DB (category 폴더 기준).
+    버전 포맷이 있으면 그것을, 없으면 예전 pkl/pt 파일을 읽어 같은 형태로 돌려준다.
+
+    Return:
+        (texts, categories, embeddings_norm) — embeddings_norm은 L2 정규화된 float32 (N, D)
     """
     category_path = os.path.join(VECTOR_DB_PATH, "category")
-    return load_vector_db(category_path)
+    if is_category_db(category_path):
+        return load_category_db(category_path)
+
+    logger.warning(
+        "예전 pkl/pt 카테고리 DB를 읽습니다 (python -m rag.migrate_category_db 로 변환 권장)",
+        extra={"path": category_path},
+    )
+    texts, categories, embeddings = load_vector_db(category_path)
+    embeddings = embeddings.numpy().astype("float32", copy=False)
+    embeddings_norm = embeddings / (np.linalg.norm(embeddings, axis=-1, keepdims=True) + 1e-8)
+    return texts, categories, embeddings_norm
 
 
 def load_vector_db_by_path(index_path: str, chunks_path: str):
     """
-    주어진 경로의 FAISS 인덱스와 텍스트 청크 파일을 로드
+    주어진 경로의 FAISS 인덱스(검색 파라미터 포함)와 청크를 로드.
+    청크 저장소(<이름>.chunks)가 있으면 memory-map으로 열고 벡터 수와 대조, 없으면 예전 텍스트 파일을 읽는다.
     """
-    import faiss
-
-    index = faiss.read_index(index_path)
-    with open(chunks_path, "r", encoding="utf-8") as f:
-        chunks = [c.strip() for c in f.read().split("\n\n") if c.strip()]
+    index = read_index(index_path)
+    chunks = open_chunks(chunks_path)
+    if isinstance(chunks, ChunkStore):
+        if len(chunks) > index.ntotal:
+            # 증분 업데이트가 청크만 추가하고 멈춘 상태 : 인덱스에 있는 만큼만 읽는다 (정리는 incremental_index.repair)
+            logger.warning(
+                "인덱스에 반영되지 않은 청크를 무시합니다",
+                extra={"chunks_path": chunks_path, "chunks": len(chunks), "ntotal": index.ntotal},
+            )
+            chunks.close()
+            chunks = ChunkStore(chunks.path, limit=index.ntotal)
+        validate_chunk_count(chunks, index, chunks_path)
+    elif len(chunks) != index.ntotal:
+        # 예전 "\n\n" 구분 파일은 청크 안의 빈 줄 때문에 id가 어긋날 수 있다
+        logger.warning(
+            "청크 수와 인덱스 벡터 수가 다릅니다",
+            extra={"chunks_path": chunks_path, "chunks": len(chunks), "ntotal": index.ntotal},
+        )
     return chunks, index
+
+
+def to_inner_product_index(index, batch_size: int = 65536):
+    """
+    IndexFlatL2를 L2 정규화된 IndexFlatIP로 변환 (내적 = 코사인 유사도).
+    전체를 한 번에 복사하지 않도록 batch_size 단위로 옮긴다.
+    """
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return index
+    if not isinstance(index, faiss.IndexFlat):
+        raise ValueError(f"Flat 인덱스만 변환할 수 있습니다: {type(index).__name__}")
+
+    ip_index = faiss.IndexFlatIP(index.d)
+    for start in range(0, index.ntotal, batch_size):
+        n = min(batch_size, index.ntotal - start)
+        vectors = np.ascontiguousarray(index.reconstruct_n(start, n), dtype="float32")
+        faiss.normalize_L2(vectors)
+        ip_index.add(vectors)
+    return ip_index
+
+
+def search_context(index, chunks, query_emb, top_k: int = 3, threshold: float = 0.5):
+    """
+    정규화된 내적 인덱스에서 코사인 유사도 threshold 이상인 청크를 최대 top_k개 검색.
+    query_emb는 (D,) 벡터이며 여기서 정규화한다.
+
+    Return:
+        list: [(청크, 유사도), ...] 유사도 내림차순
+    """
+    query = np.ascontiguousarray(np.asarray(query_emb, dtype="float32").reshape(1, -1))
+    faiss.normalize_L2(query)
+    scores, ids = index.search(query, top_k)
+    return [
+        (chunks[i], float(score))
+        for score, i in zip(scores[0], ids[0])
+        if i >= 0 and score >= threshold
+    ]
+
+
+def search_context_batch(index, chunks, query_embs, top_k: int = 3, threshold: float = 0.5):
+    """
+    search_context의 배치 버전: (Q, D) 질문 임베딩을 index.search 한 번으로 검색
+
+    Return:
+        list: 질문마다 [(청크, 유사도), ...]
+    """
+    queries = np.ascontiguousarray(np.asarray(query_embs, dtype="float32"))
+    faiss.normalize_L2(queries)
+    scores, ids = index.search(queries, top_k)
+    return [
+        [(chunks[i], float(score)) for score, i in zip(row_scores, row_ids) if i >= 0 and score >= threshold]
+        for row_scores, row_ids in zip(scores, ids)
+    ]
+
+
+# ---- 프로세스 공용 벡터 DB 레지스트리 ----
+# (인덱스 파일, 청크 파일) 쌍마다 한 번만 로드하고 카테고리끼리 공유한다.
+# 여러 카테고리가 같은 파일을 가리키면(assist_*, default 등) 같은 객체를 돌려준다.
+_vector_db_cache = {}
+_vector_db_lock = threading.Lock()
+
+
+def _vector_db_key(index_path: str, chunks_path: str):
+    return (os.path.realpath(index_path), os.path.realpath(chunks_path))
+
+
+def get_vector_db_by_path(index_path: str, chunks_path: str):
+    """
+    (인덱스, 청크) 쌍을 레지스트리에서 가져온다. 처음 요청될 때만 디스크에서 읽는다.
+    청크는 읽기 전용(ChunkStore 또는 tuple)으로 돌려주므로 요청 간에 공유해도 수정되지 않는다.
+    """
+    key = _vector_db_key(index_path, chunks_path)
+    db = _vector_db_cache.get(key)
+    if db is not None:
+        return db
+
+    with _vector_db_lock:
+        db = _vector_db_cache.get(key)
+        if db is None:
+            chunks, index = load_vector_db_by_path(index_path, chunks_path)
+            if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+                # 예전 IndexFlatL2 파일: 로드할 때 한 번만 변환 (rag/migrate_index_to_ip.py로 파일 자체를 바꾸는 것을 권장)
+                logger.warning("L2 인덱스를 메모리에서 내적 인덱스로 변환합니다", extra={"index_path": index_path})
+                index = to_inner_product_index(index)
+            db = (chunks if isinstance(chunks, ChunkStore) else tuple(chunks), index)
+            _vector_db_cache[key] = db
+            logger.info("벡터 DB 로드", extra={"index_path": index_path, "ntotal": index.ntotal, "chunks": len(chunks)})
+    return db
+
+
+def get_vector_db(category: str):
+    """
+    카테고리에 해당하는 (청크, 인덱스)를 레지스트리에서 가져온다.
+    등록되지 않은 카테고리는 default 경로를 사용한다.
+    """
+    index_file, chunks_file = VECTOR_DB_PATHS.get(category, VECTOR_DB_PATHS["default"])
+    return get_vector_db_by_path(index_file, chunks_file)
+
+
+def preload_vector_dbs(categories=None):
+    """
+    서버 시작 시 카테고리별 벡터 DB를 미리 로드. 같은 파일은 한 번만 읽는다.
+    (treatment는 LangChain FAISS 폴더라 chatbot_core에서 따로 로드)
+    """
+    categories = categories or [c for c in VECTOR_DB_PATHS if c != "treatment"]
+    for category in categories:
+        get_vector_db(category)
+    logger.info("벡터 DB preload 완료", extra={"loaded": len(_vector_db_cache), "categories": len(categories)})
@@ -1,14 +1,18 @@
-from chatbot.chatbot_core import run_chatbot_pipeline
+from chatbot.chatbot_core import run_chatbot_pipeline_stream, ttft_summary, warmup
 
 def main():
+    warmup(background=True)  # 세션 ID 입력을 기다리는 동안 모델/벡터 DB 로드
     session_id = input("세션 아이디를 입력하세요: ") or "default"
     print(f"[INFO] 세션 ID: {session_id} (exit 입력시 종료)\n")
     while True:
         user_input = input("질문을 입력하세요 (종료: exit): ")
         if user_input.strip().lower() == "exit":
             break
-        answer = run_chatbot_pipeline(user_input, session_id=session_id)  # 세션 ID 전달
-        print(f"\n[{session_id} 응답]\n{answer}\n")
+        print(f"\n[{session_id} 응답]")
+        for token in run_chatbot_pipeline_stream(user_input, session_id=session_id):  # 세션 ID 전달
+            print(token, end="", flush=True)
+        print("\n")
+    print(f"[INFO] 첫 토큰까지 걸린 시간 : {ttft_summary()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file